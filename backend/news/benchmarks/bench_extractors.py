@@ -0,0 +1,54 @@
+"""Benchmark: extractor backends over the saved fixture pages.
+
+Parses fixtures/listing.html and fixtures/article.html with every installed
+backend. It checks that each one returns exactly the dicts of the
+``html.parser`` path, then reports parse time and peak traced memory. Run
+from ``backend/news``::
+
+    python -m benchmarks.bench_extractors
+"""
+import argparse
+
+from benchmarks.timing import measure
+from extract import EXTRACTORS, get_extractor
+from fixture_server import load_fixture
+
+BASE_URL = 'https://www.liputan6.com'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', nargs='+', default=list(EXTRACTORS))
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    listing_html = load_fixture('listing.html', BASE_URL)
+    article_html = load_fixture('article.html', BASE_URL)
+
+    reference = get_extractor('html.parser')
+    expected = {
+        'listing': lambda: reference.listing(listing_html, BASE_URL),
+        'detail': lambda: reference.detail(article_html),
+    }
+
+    print(f"{'backend':<12} {'page':<8} {'time ms':>10} {'peak MB':>10}")
+    for name in args.backends:
+        try:
+            extractor = get_extractor(name)
+        except ImportError as e:
+            print(f"{name:<12} skipped: {e}")
+            continue
+
+        cases = {
+            'listing': lambda: extractor.listing(listing_html, BASE_URL),
+            'detail': lambda: extractor.detail(article_html),
+        }
+        for page, fn in cases.items():
+            # Relative listing times resolve against the clock, so the reference is rebuilt alongside
+            assert fn() == expected[page](), f"{name} {page} output differs from html.parser"
+            elapsed, peak = measure(fn, args.repeat)
+            print(f"{name:<12} {page:<8} {elapsed:>10.2f} {peak:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
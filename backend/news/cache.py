@@ -0,0 +1,123 @@
+"""Cached, conditional fetching of liputan6 pages.
+
+Parsed listings are kept per category for a TTL and parsed articles in an
+LRU keyed by slug. Refreshes send the stored ETag / Last-Modified back, so
+an unchanged page costs a 304 and no parse. One lock per key means the
+upstream is fetched at most once per interval however many clients poll.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+
+from metrics import metrics
+
+LISTING_TTL = float(os.environ.get('LISTING_TTL', 300))
+DETAIL_TTL = float(os.environ.get('DETAIL_TTL', 60 * 60))
+DETAIL_CACHE_SIZE = int(os.environ.get('DETAIL_CACHE_SIZE', 256))
+REQUEST_TIMEOUT = float(os.environ.get('NEWS_REQUEST_TIMEOUT', 10))
+
+
+def listing_ttl(category):
+    """TTL for one category's listing: LISTING_TTL_<CATEGORY> if set, else LISTING_TTL"""
+    return float(os.environ.get(f'LISTING_TTL_{category.upper()}', LISTING_TTL))
+
+
+class _Entry:
+    def __init__(self, value, etag=None, last_modified=None):
+        self.value = value
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.time()
+
+
+class PageCache:
+    """Parsed pages by key, refreshed with conditional GETs once their TTL passes
+
+    ``parse`` turns the page HTML into the cached value. ``ttl`` is seconds or
+    a function of the key. With ``max_entries`` the least recently used
+    entries are dropped first. Fetches go through ``session`` (a pooled
+    ``requests.Session``) when one is given.
+    """
+
+    def __init__(self, parse, ttl, max_entries=None, session=None, name='pages'):
+        self.parse = parse
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.session = session or requests
+        self._entries = OrderedDict()
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def get(self, key, url):
+        """Cached value for ``key``, fetching ``url`` when it is missing or expired
+
+        A failed refresh keeps serving the stale value; with nothing cached the
+        ``requests`` exception is raised.
+        """
+        with self._lock_for(key):
+            entry = self._peek(key)
+            if entry is not None and time.time() - entry.fetched_at < self._ttl_for(key):
+                metrics.inc('cache_requests_total', cache=self.name, result='hit')
+                return entry.value
+
+            metrics.inc('cache_requests_total', cache=self.name, result='miss' if entry is None else 'refresh')
+            try:
+                entry = self._fetch(url, entry)
+            except requests.exceptions.RequestException as e:
+                if entry is None:
+                    raise
+                print(f"Error refreshing {url}, serving cached copy: {str(e)}")
+                return entry.value
+
+            self._store(key, entry)
+            return entry.value
+
+    def cached(self, key):
+        """Whatever is stored for ``key``, however old, without touching the network"""
+        entry = self._peek(key)
+        return entry.value if entry is not None else None
+
+    def _fetch(self, url, entry):
+        headers = {}
+        if entry is not None and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+
+        with metrics.span('fetch', cache=self.name):
+            response = self.session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304 and entry is not None:
+            metrics.inc('cache_requests_total', cache=self.name, result='not_modified')
+            entry.fetched_at = time.time()
+            return entry
+
+        response.raise_for_status()
+        with metrics.span('parse', cache=self.name):
+            value = self.parse(response.text)
+        return _Entry(value, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+    def _ttl_for(self, key):
+        return self.ttl(key) if callable(self.ttl) else self.ttl
+
+    def _peek(self, key):
+        with self._guard:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key, entry):
+        with self._guard:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while self.max_entries is not None and len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._locks.pop(evicted, None)
+
+    def _lock_for(self, key):
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
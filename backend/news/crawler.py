@@ -0,0 +1,108 @@
+"""Background crawler that keeps the news caches warm.
+
+Every ``interval`` seconds the crawler refreshes the listing of each
+configured category. It then prefetches the article details of the newest
+articles in parallel, at most ``concurrency`` at a time. All fetches share
+one pooled ``requests.Session`` with keep-alive, timeouts and bounded
+retries. The routes then answer from the caches without waiting on
+liputan6.
+
+Only one process crawls at a time: ``start`` takes an exclusive lock on
+``CRAWL_LOCK`` first, and a process that does not get it keeps fetching on
+demand.
+"""
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from cache import LISTING_TTL
+from metrics import metrics
+
+CRAWL_ENABLED = os.environ.get('NEWS_CRAWL', '1') == '1'
+CRAWL_CATEGORIES = [c.strip().lower() for c in os.environ.get('CRAWL_CATEGORIES', 'saham').split(',') if c.strip()]
+CRAWL_INTERVAL = float(os.environ.get('CRAWL_INTERVAL', LISTING_TTL))
+DETAIL_CONCURRENCY = int(os.environ.get('DETAIL_CONCURRENCY', 4))
+# Newest articles per category whose details are prefetched
+DETAIL_PREFETCH = int(os.environ.get('DETAIL_PREFETCH', 30))
+CRAWL_LOCK = os.environ.get('CRAWL_LOCK', os.path.join(tempfile.gettempdir(), 'bursalens-news-crawl.lock'))
+
+
+def make_session(pool_size=DETAIL_CONCURRENCY + 2, retries=3):
+    """requests.Session with a keep-alive connection pool and retries with backoff"""
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=('GET', 'HEAD'))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = 'bursalens-news/1.0'
+    return session
+
+
+class Crawler:
+    def __init__(self, get_listing, get_detail, categories=None, interval=CRAWL_INTERVAL,
+                 concurrency=DETAIL_CONCURRENCY, prefetch=DETAIL_PREFETCH, lock_path=CRAWL_LOCK):
+        self.get_listing = get_listing
+        self.get_detail = get_detail
+        self.categories = categories if categories is not None else CRAWL_CATEGORIES
+        self.interval = interval
+        self.prefetch = prefetch
+        self.lock_path = lock_path
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='crawl')
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock_file = None
+        self._claimed = False
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        """Start crawling in the background unless another process already crawls"""
+        if self._claimed:
+            return self
+        self._claimed = True
+        self._lock_file = self._acquire_lock()
+        if self._lock_file is not None:
+            self._thread = threading.Thread(target=self._loop, name='news-crawler', daemon=True)
+            self._thread.start()
+        return self
+
+    def _acquire_lock(self):
+        """Hold an exclusive lock on ``lock_path`` for the life of the process, or return None"""
+        import fcntl
+
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def stop(self):
+        self._stop.set()
+
+    def crawl_once(self):
+        """Refresh every category listing and prefetch its newest articles"""
+        for category in self.categories:
+            articles = self.get_listing(category)
+            slugs = [article['slug'] for article in articles[:self.prefetch]]
+            # get_detail reports its own fetch errors, so this just waits for the batch
+            list(self._pool.map(self.get_detail, slugs))
+
+    def _loop(self):
+        while True:
+            try:
+                with metrics.span('crawl'):
+                    self.crawl_once()
+            except Exception as e:
+                print(f"Error crawling news: {str(e)}")
+            if self._stop.wait(self.interval):
+                return
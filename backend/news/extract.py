@@ -0,0 +1,281 @@
+"""Field extraction from liputan6 listing and article pages.
+
+Each backend only pulls the raw strings out of a page. Turning them into
+the response dicts (dates, placeholder images, media lists) is shared, so
+every backend returns identical output for the same page. The backend is
+chosen with NEWS_PARSER:
+
+- ``html.parser``: BeautifulSoup with the pure-Python parser (default
+  when lxml is not installed)
+- ``bs4-lxml``: BeautifulSoup on lxml's tree builder
+- ``lxml``: lxml.html with XPath, no BeautifulSoup (default)
+- ``selectolax``: selectolax's lexbor parser with CSS selectors
+
+Text is collected the way BeautifulSoup's ``get_text`` does it: comments
+and the contents of script, style and template tags are skipped.
+"""
+import os
+from datetime import datetime
+
+
+
+def default_parser():
+    """The fastest backend that needs nothing beyond the requirements: lxml, else html.parser"""
+    try:
+        import lxml.html  # noqa: F401
+    except ImportError:
+        return 'html.parser'
+    return 'lxml'
+
+
+PARSER = os.environ.get('NEWS_PARSER') or default_parser()
+
+# Tags whose text get_text leaves out
+SKIP_TEXT = {'script', 'style', 'template'}
+
+# Define the months mapping
+months = {
+    'Jan': 'Januari', 'Feb': 'Februari', 'Mar': 'Maret', 'Apr': 'April',
+    'Mei': 'Mei', 'Jun': 'Juni', 'Jul': 'Juli', 'Agu': 'Agustus',
+    'Sep': 'September', 'Okt': 'Oktober', 'Nov': 'November', 'Des': 'Desember'
+}
+
+# Function to convert time strings like "2 jam yang lalu"
+def get_date_from_time_ago(time_string):
+    now = datetime.now()
+    if "detik yang lalu" in time_string:
+        seconds = int(time_string.split()[0])
+        return now.strftime('%Y-%m-%d %H:%M')
+    elif "menit yang lalu" in time_string:
+        minutes = int(time_string.split()[0])
+        now = now.replace(minute=now.minute - minutes)
+        return now.strftime('%Y-%m-%d %H:%M')
+    elif "jam yang lalu" in time_string:
+        hours = int(time_string.split()[0])
+        now = now.replace(hour=now.hour - hours)
+        return now.strftime('%Y-%m-%d %H:%M')
+    return now.strftime('%Y-%m-%d %H:%M')
+
+
+def join_text(strings, separator='', strip=False):
+    """Join text nodes like get_text(separator, strip)"""
+    if strip:
+        return separator.join(s.strip() for s in strings if s.strip())
+    return separator.join(strings)
+
+
+def listing_item(base_url, title, time, image_thumbnail, link):
+    """Response dict for one article of a listing page"""
+    # Fallback if the image is a placeholder
+    if image_thumbnail and "blank.png" in image_thumbnail:
+        image_thumbnail = "No Image"
+    slug = link.replace(base_url, "")
+
+    # Convert time using the provided month names
+    time_parts = time.split()
+    if len(time_parts) > 1 and time_parts[1] in months:
+        time_parts[1] = months[time_parts[1]]
+    formatted_time = ' '.join(time_parts).replace(" WIB", "")
+
+    try:
+        new_time = datetime.strptime(formatted_time, '%d %B %Y %H:%M').strftime('%Y-%m-%d %H:%M')
+    except ValueError:
+        new_time = get_date_from_time_ago(time)
+
+    return {
+        'title': title,
+        'image_thumbnail': image_thumbnail,
+        'time': new_time,
+        'link': link,
+        'slug': slug
+    }
+
+
+def detail_item(title, content, image, time_text, embeds, images, links):
+    """Response dict for an article page"""
+    time_text = time_text.replace(" pada ", "") if time_text is not None else ""
+    # Only split if time_text is not empty
+    time_parts = time_text.split() if time_text else []
+
+    if len(time_parts) > 1 and time_parts[1] in months:
+        time_parts[1] = months[time_parts[1]]
+    try:
+        new_time = datetime.strptime(' '.join(time_parts), '%d %B %Y, %H:%M').strftime('%Y-%m-%d %H:%M')
+    except ValueError:
+        new_time = time_text
+
+    medias = [{'type': 'embed', 'url': url} for url in embeds]
+    medias.extend({'type': 'image', 'url': url} for url in images
+                  if url and "blank" not in url and ".gif" not in url)
+    medias.extend({'type': 'article', 'url': url} for url in links)
+
+    return {
+        'title': title,
+        'content': content,
+        'image': image,
+        'time': new_time,
+        'media': medias
+    }
+
+
+class Extractor:
+    """Backends implement listing_fields and detail_fields"""
+    name = None
+
+    def listing(self, html, base_url):
+        return [listing_item(base_url, **fields) for fields in self.listing_fields(html)]
+
+    def detail(self, html):
+        return detail_item(**self.detail_fields(html))
+
+
+class SoupExtractor(Extractor):
+    def __init__(self, features='html.parser'):
+        from bs4 import BeautifulSoup
+
+        self._soup = BeautifulSoup
+        self.features = features
+        self.name = 'html.parser' if features == 'html.parser' else f'bs4-{features}'
+
+    def listing_fields(self, html):
+        soup = self._soup(html, self.features)
+        for article in soup.select(".articles--iridescent-list article"):
+            image_elem = article.select_one('picture img')
+            yield {
+                'title': article.select_one('.articles--iridescent-list--text-item__title-link-text').get_text(strip=True),
+                'time': article.select_one('.articles--iridescent-list--text-item__time').get_text(strip=True),
+                'image_thumbnail': (image_elem.get('data-src') or image_elem.get('src')) if image_elem is not None else None,
+                'link': article.select_one('h4 a')['href'],
+            }
+
+    def detail_fields(self, html):
+        soup = self._soup(html, self.features)
+        title_elem = soup.select_one(".article-header__title")
+        image_elem = soup.select_one(".article-photo-gallery--item__content img")
+        time_elem = soup.select_one(".article-header__datetime")
+        return {
+            'title': title_elem.get_text(strip=True) if title_elem is not None else None,
+            'content': soup.select_one(".article-content-body").get_text(separator="\n", strip=True),
+            'image': image_elem['src'] if image_elem is not None else None,
+            'time_text': time_elem.get_text() if time_elem is not None else None,
+            'embeds': [embed['src'] for embed in soup.select("iframe")],
+            'images': [img.get('data-src') for img in soup.select("img")],
+            'links': [a['href'] for a in soup.select("article a")],
+        }
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class LxmlExtractor(Extractor):
+    name = 'lxml'
+
+    def __init__(self):
+        import lxml.html
+
+        self._parse = lxml.html.document_fromstring
+
+    @staticmethod
+    def _strings(element):
+        if element.text:
+            yield element.text
+        for child in element:
+            # Comments and processing instructions have a non-string tag
+            if isinstance(child.tag, str) and child.tag not in SKIP_TEXT:
+                yield from LxmlExtractor._strings(child)
+            if child.tail:
+                yield child.tail
+
+    def _text(self, element, separator='', strip=False):
+        return join_text(self._strings(element), separator, strip)
+
+    @staticmethod
+    def _first(element, xpath):
+        found = element.xpath(xpath)
+        return found[0] if found else None
+
+    def listing_fields(self, html):
+        root = self._parse(html)
+        for article in root.xpath(f"//*[{_has_class('articles--iridescent-list')}]//article"):
+            image_elem = self._first(article, './/picture//img')
+            yield {
+                'title': self._text(self._first(article, f".//*[{_has_class('articles--iridescent-list--text-item__title-link-text')}]"), strip=True),
+                'time': self._text(self._first(article, f".//*[{_has_class('articles--iridescent-list--text-item__time')}]"), strip=True),
+                'image_thumbnail': (image_elem.get('data-src') or image_elem.get('src')) if image_elem is not None else None,
+                'link': self._first(article, './/h4//a').attrib['href'],
+            }
+
+    def detail_fields(self, html):
+        root = self._parse(html)
+        title_elem = self._first(root, f"//*[{_has_class('article-header__title')}]")
+        image_elem = self._first(root, f"//*[{_has_class('article-photo-gallery--item__content')}]//img")
+        time_elem = self._first(root, f"//*[{_has_class('article-header__datetime')}]")
+        return {
+            'title': self._text(title_elem, strip=True) if title_elem is not None else None,
+            'content': self._text(self._first(root, f"//*[{_has_class('article-content-body')}]"), "\n", strip=True),
+            'image': image_elem.attrib['src'] if image_elem is not None else None,
+            'time_text': self._text(time_elem) if time_elem is not None else None,
+            'embeds': [embed.attrib['src'] for embed in root.iter('iframe')],
+            'images': [img.get('data-src') for img in root.iter('img')],
+            'links': [a.attrib['href'] for a in root.xpath('//article//a')],
+        }
+
+
+class SelectolaxExtractor(Extractor):
+    name = 'selectolax'
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+
+        self._parse = LexborHTMLParser
+
+    @staticmethod
+    def _strings(node):
+        for child in node.iter(include_text=True):
+            if child.tag == '-text':
+                yield child.text_content
+            elif child.is_element_node and child.tag not in SKIP_TEXT:
+                yield from SelectolaxExtractor._strings(child)
+
+    def _text(self, node, separator='', strip=False):
+        return join_text(self._strings(node), separator, strip)
+
+    def listing_fields(self, html):
+        tree = self._parse(html)
+        for article in tree.css(".articles--iridescent-list article"):
+            image_elem = article.css_first('picture img')
+            yield {
+                'title': self._text(article.css_first('.articles--iridescent-list--text-item__title-link-text'), strip=True),
+                'time': self._text(article.css_first('.articles--iridescent-list--text-item__time'), strip=True),
+                'image_thumbnail': (image_elem.attributes.get('data-src') or image_elem.attributes.get('src')) if image_elem is not None else None,
+                'link': article.css_first('h4 a').attributes['href'],
+            }
+
+    def detail_fields(self, html):
+        tree = self._parse(html)
+        title_elem = tree.css_first(".article-header__title")
+        image_elem = tree.css_first(".article-photo-gallery--item__content img")
+        time_elem = tree.css_first(".article-header__datetime")
+        return {
+            'title': self._text(title_elem, strip=True) if title_elem is not None else None,
+            'content': self._text(tree.css_first(".article-content-body"), "\n", strip=True),
+            'image': image_elem.attributes['src'] if image_elem is not None else None,
+            'time_text': self._text(time_elem) if time_elem is not None else None,
+            'embeds': [embed.attributes['src'] for embed in tree.css("iframe")],
+            'images': [img.attributes.get('data-src') for img in tree.css("img")],
+            'links': [a.attributes['href'] for a in tree.css("article a")],
+        }
+
+
+EXTRACTORS = {
+    'html.parser': lambda: SoupExtractor('html.parser'),
+    'bs4-lxml': lambda: SoupExtractor('lxml'),
+    'lxml': LxmlExtractor,
+    'selectolax': SelectolaxExtractor,
+}
+
+
+def get_extractor(name=PARSER):
+    """Build the named extractor backend; raises KeyError for unknown names"""
+    return EXTRACTORS[name]()
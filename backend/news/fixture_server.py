@@ -0,0 +1,76 @@
+"""Local stand-in for liputan6 that serves the pages in fixtures/.
+
+Any path ending in ``/read/...`` gets the article fixture and any other path
+gets the listing fixture, with ``{{BASE_URL}}`` filled in with this server's
+address. Responses carry an ETag and Last-Modified and answer conditional
+requests with 304, like the real site. Run it and point the app at it::
+
+    python fixture_server.py --port 8001
+    NEWS_BASE_URL=http://localhost:8001 NEWS_DETAIL_BASE_URL=http://localhost:8001 python app.py
+"""
+import argparse
+import hashlib
+import os
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixture(name, base_url):
+    with open(os.path.join(FIXTURE_DIR, name), encoding='utf-8') as f:
+        return f.read().replace('{{BASE_URL}}', base_url)
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    # Set on the server class: {path kind: (body, etag, last_modified)}
+    pages = {}
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        kind = 'article' if '/read/' in self.path else 'listing'
+        body, etag, last_modified = self.pages[kind]
+
+        if self.headers.get('If-None-Match') == etag or self.headers.get('If-Modified-Since') == last_modified:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(host='127.0.0.1', port=8001):
+    """Build the fixture server; port 0 picks a free port"""
+    server = ThreadingHTTPServer((host, port), FixtureHandler)
+    base_url = f"http://{host}:{server.server_address[1]}"
+    last_modified = formatdate(usegmt=True)
+
+    pages = {}
+    for kind in ('listing', 'article'):
+        body = load_fixture(f'{kind}.html', base_url).encode('utf-8')
+        pages[kind] = (body, f'"{hashlib.md5(body).hexdigest()}"', last_modified)
+    FixtureHandler.pages = pages
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve liputan6 fixture pages locally')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port)
+    print(f"Serving fixtures on http://{args.host}:{server.server_address[1]}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
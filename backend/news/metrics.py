@@ -0,0 +1,214 @@
+"""Stage timings, counters and a Prometheus endpoint for the news service.
+
+``metrics.span('crawl')`` times a block into the ``stage_seconds``
+histogram, and ``metrics.inc(...)`` counts cache hits and misses. Every
+request's latency is recorded per route, and ``/metrics`` renders it all in
+the Prometheus text format. With METRICS=0, spans are a shared no-op
+context manager and counters return immediately.
+
+PROFILE_SLOW_MS opts into profiling. A PROFILE_SAMPLE_RATE fraction of
+requests runs under cProfile, and the stats of those slower than the
+limit are written to PROFILE_DIR. cProfile only sees the request thread;
+fetches made by the background crawler have their own spans.
+"""
+import cProfile
+import functools
+import os
+import random
+import threading
+import time
+from contextlib import nullcontext
+
+from flask import Response, g, request
+
+METRICS_ENABLED = os.environ.get('METRICS', '1') == '1'
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 0))
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.1))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', '/tmp/profiles')
+
+# Seconds; from a cached listing to a slow liputan6 fetch with retries
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+HELP = {
+    'http_request_duration_seconds': 'Request latency by route, method and status',
+    'http_requests_total': 'Requests by route, method and status',
+    'stage_seconds': 'Time spent fetching, parsing and crawling',
+    'cache_requests_total': 'Cache lookups by cache and result',
+}
+
+_NOOP = nullcontext()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class _Span:
+    def __init__(self, metrics, labels):
+        self.metrics = metrics
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe('stage_seconds', time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Metrics:
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def span(self, stage, **labels):
+        """Context manager timing a block into ``stage_seconds{stage=...}``"""
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, dict(labels, stage=stage))
+
+    def timed(self, stage):
+        """Decorator form of ``span``"""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(self, {'stage': stage}):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = [(key, list(h.counts), h.sum, h.count, h.buckets) for key, h in self._histograms.items()]
+            counters = list(self._counters.items())
+
+        lines = []
+        described = set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), counts, total, count, buckets in sorted(histograms, key=lambda item: item[0]):
+            describe(name, 'histogram')
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', bound))} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        for (name, labels), value in sorted(counters, key=lambda item: item[0]):
+            describe(name, 'counter')
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        return '\n'.join(lines) + '\n'
+
+
+def init_app(app, metrics):
+    """Record per-route latency, add ``/metrics`` and the slow-request profiler to a Flask app"""
+
+    @app.before_request
+    def start_timer():
+        if not metrics.enabled and not PROFILE_SLOW_MS:
+            return
+        g.metrics_started = time.perf_counter()
+        if PROFILE_SLOW_MS and random.random() < PROFILE_SAMPLE_RATE:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Python 3.12+ allows one active profiler; another request already has it
+                return
+            g.profiler = profiler
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            if elapsed * 1000 >= PROFILE_SLOW_MS:
+                _dump_profile(profiler, elapsed)
+
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        labels = {'route': route, 'method': request.method, 'status': response.status_code}
+        metrics.observe('http_request_duration_seconds', elapsed, **labels)
+        metrics.inc('http_requests_total', **labels)
+        return response
+
+    @app.teardown_request
+    def stop_profiler(exc):
+        # after_request is skipped when a view raises; never leave a profiler running
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+
+    @app.route('/metrics', methods=['GET'])
+    def prometheus_metrics():
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+def _dump_profile(profiler, elapsed):
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = f"{int(time.time() * 1000)}-{request.endpoint or 'unmatched'}-{int(elapsed * 1000)}ms.prof"
+        profiler.dump_stats(os.path.join(PROFILE_DIR, name))
+    except OSError as e:
+        print(f"Error writing request profile: {str(e)}")
+
+
+metrics = Metrics()
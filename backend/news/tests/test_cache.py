@@ -0,0 +1,114 @@
+"""PageCache against the local fixture server, counting upstream requests."""
+import socket
+import threading
+
+import pytest
+import requests
+
+from cache import PageCache
+from fixture_server import FixtureHandler, make_server
+
+
+@pytest.fixture
+def base_url():
+    server = make_server(port=0)
+    FixtureHandler.hits = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def dead_url():
+    """A URL on a port nothing listens on"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/saham"
+
+
+class CountingParser:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, html):
+        self.calls += 1
+        return {'length': len(html)}
+
+
+def expire(cache, key):
+    cache._entries[key].fetched_at -= 24 * 60 * 60
+
+
+def test_fresh_entry_is_served_without_a_request(base_url):
+    cache = PageCache(CountingParser(), ttl=60)
+    first = cache.get('saham', f"{base_url}/saham")
+    assert cache.get('saham', f"{base_url}/saham") is first
+    assert FixtureHandler.hits == 1
+
+
+def test_not_modified_page_is_not_parsed_again(base_url):
+    parse = CountingParser()
+    cache = PageCache(parse, ttl=60)
+    first = cache.get('saham', f"{base_url}/saham")
+    expire(cache, 'saham')
+
+    assert cache.get('saham', f"{base_url}/saham") is first
+    # The refresh was a conditional request answered with 304
+    assert FixtureHandler.hits == 2
+    assert parse.calls == 1
+    # ...and it restarted the TTL
+    assert cache.get('saham', f"{base_url}/saham") is first
+    assert FixtureHandler.hits == 2
+
+
+def test_ttl_per_key(base_url):
+    cache = PageCache(CountingParser(), ttl=lambda key: 0 if key == 'bisnis' else 60)
+    for _ in range(3):
+        cache.get('saham', f"{base_url}/saham")
+        cache.get('bisnis', f"{base_url}/bisnis")
+    assert FixtureHandler.hits == 1 + 3
+
+
+def test_concurrent_callers_share_one_fetch(base_url):
+    parse = CountingParser()
+    cache = PageCache(parse, ttl=60)
+    start = threading.Barrier(16)
+    results = []
+
+    def worker():
+        start.wait()
+        results.append(cache.get('saham', f"{base_url}/saham"))
+
+    threads = [threading.Thread(target=worker) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert FixtureHandler.hits == 1
+    assert parse.calls == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_failed_refresh_serves_the_stale_copy(base_url, dead_url):
+    cache = PageCache(CountingParser(), ttl=60)
+    stale = cache.get('saham', f"{base_url}/saham")
+    expire(cache, 'saham')
+    assert cache.get('saham', dead_url) is stale
+
+
+def test_failed_first_fetch_raises(dead_url):
+    cache = PageCache(CountingParser(), ttl=60)
+    with pytest.raises(requests.exceptions.RequestException):
+        cache.get('saham', dead_url)
+
+
+def test_lru_drops_the_oldest_entry(base_url):
+    cache = PageCache(CountingParser(), ttl=60, max_entries=2)
+    for slug in ('read/1', 'read/2', 'read/3'):
+        cache.get(slug, f"{base_url}/{slug}")
+    assert cache.cached('read/1') is None
+    assert cache.cached('read/3') is not None
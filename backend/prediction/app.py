@@ -1,20 +1,88 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-import yfinance as yf
+import argparse
+import os
+import threading
+import time
 import numpy as np
-import pandas as pd
-from sklearn.preprocessing import RobustScaler
-from datetime import timedelta
-import ta
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout
-from tensorflow.keras.optimizers import Adam
-from sklearn.metrics import mean_absolute_percentage_error, r2_score
-from tensorflow.keras.callbacks import EarlyStopping
+from datetime import date, datetime, timedelta
+from services.backtest import accuracy_metrics
+from services.cache import TTLCache
+from services.datastore import DEFAULT_DATA_DIR, BarStore
+from services.indicators import FEATURE_COLUMNS, IndicatorEngine, compute_features
+from services.global_model import GLOBAL_MODEL
+from services.jobs import JobManager, JobQueueFull
+from services.metrics import init_app as init_metrics, metrics
+from services.registry import ModelRegistry
+from services.serialize import (
+    dumps, history_columns, history_payload, json_response, loads, records_to_columns, select_range
+)
+from services.runtime import INTERVAL_PERCENTILES, SERVING_RUNTIME, forecast_intervals
+from services.snapshots import SnapshotStore
+from services.singleflight import SingleFlight
+from services.stages import StageRunner
+from services.startup import PRELOAD_SYMBOLS, Readiness, profile_startup, warm_entry
+from services.windowing import make_sequences, materialize_windows, window_dataset
 
 app = Flask(__name__)
 CORS(app)
+init_metrics(app, metrics)
+
+DEFAULT_FORECAST_DAYS = 30
+MAX_FORECAST_DAYS = 90
+# Upper bound for ?samples=, the Monte Carlo dropout paths behind the p10/p50/p90 bands
+MAX_DROPOUT_SAMPLES = int(os.environ.get('MAX_DROPOUT_SAMPLES', 500))
+# Upper bound for symbols x samples on /forecast, where every symbol's paths share one batch
+MAX_DROPOUT_WINDOWS = int(os.environ.get('MAX_DROPOUT_WINDOWS', 2000))
+
+# Fundamentals change quarterly; serve them from cache and refresh in the background
+FUNDAMENTALS_TTL = int(os.environ.get('FUNDAMENTALS_TTL', 24 * 60 * 60))
+FUNDAMENTALS_CACHE_DIR = os.environ.get(
+    'FUNDAMENTALS_CACHE_DIR', os.path.join(DEFAULT_DATA_DIR, 'fundamentals')
+)
+
+# Background jobs: concurrent trainings and how many may wait in the queue
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 1))
+JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', 16))
+# When set, a /stock request for a symbol without a trained model queues a training job and returns 202
+ASYNC_COLD_START = os.environ.get('ASYNC_COLD_START', '0') == '1'
+
+# Per-stage time budgets (seconds) for /stock/<symbol>; stages past their budget are left out of the response
+STAGE_TIMEOUTS = {
+    'forecast': float(os.environ.get('FORECAST_TIMEOUT', 60)),
+    'fundamentals': float(os.environ.get('FUNDAMENTALS_TIMEOUT', 10)),
+}
+# Background work (jobs, nightly snapshots) can wait for slow stages instead of returning partial payloads
+BACKGROUND_STAGE_TIMEOUTS = {
+    'forecast': 15 * 60,
+    'fundamentals': 120,
+}
+
+# XLA-compile the training step; off by default as it is slower than graph mode for these LSTMs on CPU
+JIT_COMPILE = os.environ.get('JIT_COMPILE', '0') == '1'
+
+# Incremental training: fine-tune the saved model on new bars plus a replay sample of older windows
+FINE_TUNE_EPOCHS = int(os.environ.get('FINE_TUNE_EPOCHS', 5))
+FINE_TUNE_LEARNING_RATE = float(os.environ.get('FINE_TUNE_LEARNING_RATE', 1e-4))
+REPLAY_SAMPLES = int(os.environ.get('REPLAY_SAMPLES', 256))
+# Retrain from scratch when MAPE on unseen bars is this much (relative) worse than after the last full training
+DRIFT_THRESHOLD = float(os.environ.get('DRIFT_THRESHOLD', 0.25))
+# Newest bars, each predicted before the model was fine-tuned on it, that drift is judged on
+DRIFT_WINDOW = int(os.environ.get('DRIFT_WINDOW', 20))
+DRIFT_MIN_BARS = int(os.environ.get('DRIFT_MIN_BARS', 5))
+
+# Architecture and training settings of the per-symbol LSTM. services/tuning.py searches
+# them per symbol and the winning values are saved in the model's meta.json
+DEFAULT_HYPERPARAMETERS = {
+    'lookback_period': 30,
+    'units_1': 100,
+    'dropout_1': 0.2,
+    'units_2': 70,
+    'dropout_2': 0.1,
+    'dense_units': 50,
+    'learning_rate': 0.001,
+    'batch_size': 32,
+}
 
 DX_STOCKS = {
     'BBCA': 'Bank Central Asia',
@@ -43,60 +111,72 @@ DX_STOCKS = {
 }
 
 class StockPredictor:
-    def __init__(self):
-        self.scaler = RobustScaler()
-        self.lookback_period = 30
+    def __init__(self, registry=None, indicators=None, hyperparameters=None):
+        # Created on first use so importing the app does not import scikit-learn
+        self.scaler = None
+        self.hyperparameters = {**DEFAULT_HYPERPARAMETERS, **(hyperparameters or {})}
+        self.lookback_period = self.hyperparameters['lookback_period']
         self.model = None
+        self.forecaster = None
         self.validation_split = 0.2
         self.min_training_size = 100
         self.last_scale_params = None
-
-    def create_model(self, input_shape):
-        """Create LSTM model architecture"""
+        self.last_accuracy = None
+        # 'full' or 'incremental', and the accuracy of the last full training that drift is measured against
+        self.last_training = None
+        self.baseline_accuracy = None
+        # {'actual': [...], 'predicted': [...]} closes of the newest bars, predicted before training on them
+        self.holdout = None
+        self.registry = registry
+        self.indicators = indicators
+        self._symbol_locks = {}
+        self._symbol_locks_guard = threading.Lock()
+
+    def create_model(self, input_shape, params=None):
+        """Create LSTM model architecture
+
+        ``params`` overrides entries of the predictor's hyperparameters.
+        """
+        # Keras is imported on first training so serving with SERVING_RUNTIME=numpy never loads it
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import LSTM, Dense, Dropout
+        from tensorflow.keras.optimizers import Adam
+
+        params = {**self.hyperparameters, **(params or {})}
         model = Sequential([
-            LSTM(units=100, return_sequences=True, input_shape=input_shape),
-            Dropout(0.2),
-            LSTM(units=70, return_sequences=False),
-            Dropout(0.1),
-            Dense(units=50),
+            LSTM(units=params['units_1'], return_sequences=True, input_shape=input_shape),
+            Dropout(params['dropout_1']),
+            LSTM(units=params['units_2'], return_sequences=False),
+            Dropout(params['dropout_2']),
+            Dense(units=params['dense_units']),
             Dense(units=1)
         ])
 
-        model.compile(optimizer=Adam(learning_rate=0.001), loss='mse')
+        model.compile(optimizer=Adam(learning_rate=params['learning_rate']), loss='mse', jit_compile=JIT_COMPILE)
         return model
 
-    def add_features(self, df):
-        """Create technical indicators for LSTM input"""
-        df = df.copy()
+    @metrics.timed('add_features')
+    def add_features(self, df, symbol=None):
+        """Create technical indicators for LSTM input
 
-        # Price-based features
-        df['Returns'] = df['Close'].pct_change()
-        df['SMA20'] = df['Close'].rolling(window=20).mean()
-        df['SMA50'] = df['Close'].rolling(window=50).mean()
+        Returns, SMA20/50, RSI, ROC, MACD histogram, Bollinger width and volume
+        ratio, computed in one vectorized pass. With a symbol and an indicator
+        engine, the per-symbol cached state is reused and only new bars are computed.
+        """
+        if symbol is not None and self.indicators is not None:
+            return self.indicators.features(symbol, df)
+        return compute_features(df)
 
-        # Momentum indicators
-        df['RSI'] = ta.momentum.rsi(df['Close'])
-        df['ROC'] = ta.momentum.roc(df['Close'])
+    @metrics.timed('prepare_data')
+    def prepare_data(self, df, fit_scaler=True, symbol=None, scaler=None, lookback=None):
+        """Prepare data for LSTM training
 
-        # Trend indicators
-        df['MACD'] = ta.trend.macd_diff(df['Close'])
-
-        # Volatility indicators
-        bollinger = ta.volatility.BollingerBands(df['Close'])
-        df['BB_width'] = (bollinger.bollinger_hband() - bollinger.bollinger_lband()) / df['Close']
-
-        # Volume features
-        df['Volume_SMA'] = df['Volume'].rolling(window=20).mean()
-        df['Volume_Ratio'] = df['Volume'] / df['Volume_SMA']
-
-        return df.ffill().fillna(0)
-
-    def prepare_data(self, df):
-        """Prepare data for LSTM training"""
+        ``lookback`` defaults to the predictor's; serving passes the one the model was trained with.
+        """
         try:
-            data = self.add_features(df)
+            data = self.add_features(df, symbol)
 
-            feature_columns = ['Close', 'Returns', 'SMA20', 'SMA50', 'RSI', 'ROC', 'MACD', 'BB_width', 'Volume_Ratio']
+            feature_columns = FEATURE_COLUMNS
 
             # Ensure all required columns exist
             for col in feature_columns:
@@ -104,13 +184,22 @@ class StockPredictor:
                     print(f"Missing column: {col}")
                     return None, None, None
 
-            # Scale the features
-            scaled_data = self.scaler.fit_transform(data[feature_columns])
+            # float32 from here on: the scaler preserves it and the windows are views over its output
+            data = data[feature_columns].astype(np.float32)
+
+            # Scale the features, reusing the fitted scaler when serving a trained model
+            if scaler is None:
+                if self.scaler is None:
+                    from sklearn.preprocessing import RobustScaler
+                    self.scaler = RobustScaler()
+                scaler = self.scaler
+            if fit_scaler:
+                scaled_data = scaler.fit_transform(data[feature_columns])
+            else:
+                scaled_data = scaler.transform(data[feature_columns])
 
-            X, y = [], []
-            for i in range(self.lookback_period, len(scaled_data)):
-                X.append(scaled_data[i-self.lookback_period:i])
-                y.append(scaled_data[i, 0])  # Predict the scaled closing price
+            # Windows are strided views over scaled_data; y is the scaled closing price
+            X, y = make_sequences(scaled_data, lookback or self.lookback_period)
 
             if len(X) < self.min_training_size:
                 print(f"Insufficient data: {len(X)} samples, need at least {self.min_training_size}")
@@ -121,50 +210,42 @@ class StockPredictor:
                 'feature_columns': feature_columns
             }
 
-            return np.array(X), np.array(y), feature_columns
+            return X, y, feature_columns
 
         except Exception as e:
             print(f"Error in prepare_data: {str(e)}")
             return None, None, None
 
+    def latest_window(self, df, scaler, lookback, symbol=None):
+        """Scaled features of the last ``lookback`` bars, or None if there are fewer
+
+        Training windows stop one bar short of the data, since each needs the
+        following close as its target; a forecast starts from the latest bar.
+        """
+        data = self.add_features(df, symbol)
+        if len(data) < lookback:
+            print(f"Insufficient data: {len(data)} bars, need at least {lookback}")
+            return None
+        return scaler.transform(data[FEATURE_COLUMNS].iloc[-lookback:].astype(np.float32))
+
     def calculate_accuracy_metrics(self, y_true, y_pred):
         """Calculate various accuracy metrics for the predictions"""
         try:
-            # Mean Absolute Percentage Error (MAPE)
-            mape = mean_absolute_percentage_error(y_true, y_pred) * 100
-
-            # R-squared score
-            r2 = r2_score(y_true, y_pred)
-
-            # Calculate directional accuracy
-            actual_direction = np.sign(np.diff(y_true))
-            pred_direction = np.sign(np.diff(y_pred))
-            directional_accuracy = np.mean(actual_direction == pred_direction) * 100
-
-            # Root Mean Squared Error (RMSE)
-            rmse = np.sqrt(np.mean((y_true - y_pred) ** 2))
-
-            # Calculate percentage accuracy based on a threshold
-            threshold = 0.02  # 2% threshold
-            within_threshold = np.abs((y_true - y_pred) / y_true) <= threshold
-            threshold_accuracy = np.mean(within_threshold) * 100
-
-            return {
-                'mape': round(mape, 2),
-                'r2_score': round(r2 * 100, 2),
-                'directional_accuracy': round(directional_accuracy, 2),
-                'rmse': round(rmse, 2),
-                'threshold_accuracy': round(threshold_accuracy, 2)
-            }
+            # MAPE, R-squared, directional accuracy, RMSE and the share within 2%, as in the backtests
+            return {name: round(float(value), 2) for name, value in accuracy_metrics(y_true, y_pred).items()}
         except Exception as e:
             print(f"Error calculating accuracy metrics: {str(e)}")
             return None
 
 
-    def train_model(self, df):
+    @metrics.timed('train')
+    def train_model(self, df, symbol=None, callbacks=None):
         """Train LSTM model with prepared data and calculate accuracy metrics"""
+        from tensorflow.keras.callbacks import EarlyStopping
+        from services.forecasting import Forecaster
+
         try:
-            X, y, feature_columns = self.prepare_data(df)
+            X, y, feature_columns = self.prepare_data(df, symbol=symbol)
 
             if X is None:
                 raise ValueError("Failed to prepare data")
@@ -174,38 +255,29 @@ class StockPredictor:
 
             # Create and train the model
             self.model = self.create_model(input_shape=(X.shape[1], X.shape[2]))
+            self.forecaster = Forecaster(self.model, self.lookback_period, X.shape[2])
 
-            # Split into training and validation sets
+            # Split into training and validation sets, batched from the window views by tf.data
             split_idx = int(len(X) * (1 - self.validation_split))
-            X_train, X_val = X[:split_idx], X[split_idx:]
-            y_train, y_val = y[:split_idx], y[split_idx:]
+            batch_size = self.hyperparameters['batch_size']
+            train_data = window_dataset(X[:split_idx], y[:split_idx], batch_size=batch_size, shuffle=True)
+            val_data = window_dataset(X[split_idx:], y[split_idx:], batch_size=batch_size, cache=True)
 
             early_stopping = EarlyStopping(monitor='val_loss', patience=15, restore_best_weights=True)
 
             # Train the model
             self.model.fit(
-                X_train, y_train,
-                validation_data=(X_val, y_val),
+                train_data,
+                validation_data=val_data,
                 epochs=100,
-                batch_size=32,
                 verbose=1,
-                callbacks=[early_stopping]
+                callbacks=[early_stopping] + list(callbacks or [])
             )
 
-            # Get predictions for validation set
-            y_pred = self.model.predict(X_val)
-
-            # Inverse transform the scaled values
-            dummy_features = np.zeros((len(y_val), self.last_scale_params['n_features'] - 1))
-            y_true_full = np.hstack([y_val.reshape(-1, 1), dummy_features])
-            y_pred_full = np.hstack([y_pred, dummy_features])
-
-            y_true_actual = self.scaler.inverse_transform(y_true_full)[:, 0]
-            y_pred_actual = self.scaler.inverse_transform(y_pred_full)[:, 0]
-
-            # Calculate accuracy metrics
-            accuracy_metrics = self.calculate_accuracy_metrics(y_true_actual, y_pred_actual)
-            self.last_accuracy = accuracy_metrics
+            self.last_accuracy = self.validation_accuracy(val_data, y[split_idx:])
+            self.last_training = 'full'
+            self.baseline_accuracy = self.last_accuracy
+            self.holdout = None
 
             return True
 
@@ -213,60 +285,210 @@ class StockPredictor:
             print(f"Error in train_model: {str(e)}")
             return False
 
+    @metrics.timed('fine_tune')
+    def fine_tune(self, df, entry, model, symbol=None, callbacks=None):
+        """Continue training a saved model on the bars that arrived since it was saved
 
-    def predict_future(self, data, days=30):
-        """Generate future predictions using LSTM"""
-        try:
-            if len(data) < self.min_training_size + self.lookback_period:
-                print(f"Warning: Limited data available. Predictions may be less accurate.")
+        ``entry`` is the symbol's registry entry and ``model`` its Keras model.
+        The saved scaler is reused, and the model is fitted for a few epochs
+        on the new windows plus a random replay sample of training windows,
+        so it does not forget the rest of the history.
 
-            if self.model is None:
-                if not self.train_model(data):
-                    raise ValueError("Failed to train model")
+        Each new bar is predicted before the model is fitted on it. The last
+        DRIFT_WINDOW of those predictions are kept in ``meta.json``, and
+        their MAPE is the accuracy of an incremental model. Returns False
+        when there is nothing new to learn from or when that MAPE has drifted
+        more than DRIFT_THRESHOLD past the last full training; the caller
+        then keeps the entry or retrains from scratch.
+        """
+        from tensorflow.keras.optimizers import Adam
 
-            # Prepare the most recent data for prediction
-            X, _, feature_columns = self.prepare_data(data)
+        try:
+            data_end = entry.meta.get('data_end')
+            if data_end is None:
+                return False
+            n_new = int(np.count_nonzero(df.index.strftime('%Y-%m-%d') > data_end))
+            if n_new == 0:
+                print(f"No new bars since {data_end}")
+                return False
+
+            self.scaler = entry.scaler
+            self.lookback_period = entry.meta.get('lookback_period', self.lookback_period)
+            X, y, feature_columns = self.prepare_data(df, fit_scaler=False, symbol=symbol)
             if X is None:
-                raise ValueError("Failed to prepare prediction data")
+                raise ValueError("Failed to prepare data")
+
+            # The last n_new windows predict bars the model has never seen: score them before fitting
+            n_new = min(n_new, len(X))
+            older = len(X) - n_new
+            scale, center = self.scaler.scale_[0], self.scaler.center_[0]
+            predicted = model.predict(materialize_windows(X[older:]), verbose=0)[:, 0] * scale + center
+            actual = y[older:] * scale + center
+            holdout = entry.meta.get('holdout') or {'actual': [], 'predicted': []}
+            self.holdout = {
+                'actual': (holdout['actual'] + [round(float(v), 4) for v in actual])[-DRIFT_WINDOW:],
+                'predicted': (holdout['predicted'] + [round(float(v), 4) for v in predicted])[-DRIFT_WINDOW:],
+            }
+            self.last_training = 'incremental'
+            self.baseline_accuracy = entry.meta.get('baseline_accuracy') or entry.accuracy
+            self.last_accuracy = entry.accuracy
+            if len(self.holdout['actual']) >= DRIFT_MIN_BARS:
+                self.last_accuracy = self.calculate_accuracy_metrics(
+                    np.array(self.holdout['actual']), np.array(self.holdout['predicted'])
+                )
+                if self.last_accuracy is None:
+                    return False
+                baseline_mape = (self.baseline_accuracy or {}).get('mape')
+                if baseline_mape is not None and self.last_accuracy['mape'] > baseline_mape * (1 + DRIFT_THRESHOLD):
+                    print(f"MAPE on new bars drifted from {baseline_mape} to {self.last_accuracy['mape']}, retraining")
+                    return False
+
+            # Replay only from the full training's training block, never its validation windows
+            pool = min(older, int(len(X) * (1 - self.validation_split)))
+            replay = np.random.default_rng().choice(pool, size=min(REPLAY_SAMPLES, pool), replace=False)
+            indices = np.concatenate([np.sort(replay), np.arange(older, len(X))])
+            X_train, y_train = materialize_windows(X[indices]), y[indices]
+
+            self.model = model
+            self.model.compile(optimizer=Adam(learning_rate=FINE_TUNE_LEARNING_RATE), loss='mse',
+                               jit_compile=JIT_COMPILE)
+            self.model.fit(
+                X_train, y_train,
+                epochs=FINE_TUNE_EPOCHS,
+                batch_size=self.hyperparameters['batch_size'],
+                verbose=1,
+                callbacks=list(callbacks or [])
+            )
 
-            # Get the last sequence
-            last_sequence = X[-1:]
+            from services.forecasting import Forecaster
+            self.forecaster = Forecaster(self.model, self.lookback_period, X.shape[2])
+            return True
 
-            predictions = []
-            current_sequence = last_sequence.copy()
+        except Exception as e:
+            print(f"Error in fine_tune: {str(e)}")
+            return False
 
-            for _ in range(days):
-                # Predict next value
-                pred = self.model.predict(current_sequence, verbose=0)
-                scaled_pred = pred[0][0]
-                predictions.append(scaled_pred)
+    def validation_accuracy(self, X_val, y_val):
+        """Accuracy metrics of the current model on scaled validation windows, in price units
+
+        ``X_val`` is an array of windows or a ``tf.data`` dataset of them in order.
+        """
+        y_pred = self.model.predict(X_val)[:, 0]
+
+        # RobustScaler's inverse for the Close column alone
+        scale, center = self.scaler.scale_[0], self.scaler.center_[0]
+        y_true_actual = y_val * scale + center
+        y_pred_actual = y_pred * scale + center
+
+        # Calculate accuracy metrics
+        return self.calculate_accuracy_metrics(y_true_actual, y_pred_actual)
+
+
+    def save_model(self, registry, symbol, data):
+        """Persist the trained model, scaler and metrics for a symbol"""
+        return registry.save(
+            symbol, self.model, self.scaler, self.last_accuracy,
+            lookback_period=self.lookback_period,
+            feature_columns=self.last_scale_params['feature_columns'],
+            data_end=data.index[-1].strftime('%Y-%m-%d'),
+            training=self.last_training,
+            baseline_accuracy=self.baseline_accuracy,
+            holdout=self.holdout,
+            hyperparameters={**self.hyperparameters, 'lookback_period': self.lookback_period},
+        )
+
+    def symbol_lock(self, symbol):
+        """Lock serializing training and other model writes for one symbol"""
+        with self._symbol_locks_guard:
+            return self._symbol_locks.setdefault(symbol.upper(), threading.RLock())
+
+    def train_symbol(self, symbol, data, callbacks=None, incremental=False, hyperparameters=None):
+        """Train a model for a symbol and save it to the registry
+
+        With ``incremental`` the saved model is fine-tuned on the new bars
+        instead, falling back to a full training when there is no saved
+        model or its accuracy has drifted. An entry that is already up to
+        date with ``data`` is returned as is. Without ``hyperparameters``
+        the ones of the saved model are kept (e.g. from a tuning run).
+        """
+        with self.symbol_lock(symbol):
+            if hyperparameters is None:
+                hyperparameters = (self.registry.read_meta(symbol) or {}).get('hyperparameters')
+            # Train on a dedicated predictor so no model or scaler state is shared between symbols
+            trainer = StockPredictor(indicators=self.indicators, hyperparameters=hyperparameters)
+            entry = self.registry.get(symbol) if incremental else None
+            if entry is not None:
+                if entry.meta.get('data_end') == data.index[-1].strftime('%Y-%m-%d'):
+                    return entry
+                # A fresh Keras copy: the cached entry may be serving, or be a NumPy runtime model
+                model = self.registry.load_keras(symbol)
+                if model is not None and trainer.fine_tune(data, entry, model, symbol, callbacks):
+                    return trainer.save_model(self.registry, symbol, data)
+                trainer = StockPredictor(indicators=self.indicators, hyperparameters=hyperparameters)
+
+            if not trainer.train_model(data, symbol, callbacks):
+                raise ValueError("Failed to train model")
+            return trainer.save_model(self.registry, symbol, data)
+
+    def load_symbol(self, symbol, data, callbacks=None):
+        """Return the registry entry for a symbol, training and saving one from data if none exists"""
+        entry = self.registry.get(symbol)
+        if entry is not None:
+            return entry
+
+        with self.symbol_lock(symbol):
+            # Another request may have finished training while we waited
+            entry = self.registry.get(symbol)
+            if entry is None:
+                entry = self.train_symbol(symbol, data, callbacks)
+        return entry
+
+    @metrics.timed('predict')
+    def predict_future(self, data, days=30, symbol=None, entry=None, samples=0):
+        """Generate future predictions using LSTM
+
+        With a symbol (or its registry entry) the prediction only reads that
+        entry's model and scaler, so concurrent calls never touch shared state.
+        Returns prices of shape ``(days, 1)``, or ``(days, 4)`` with
+        ``samples``: the forecast followed by the INTERVAL_PERCENTILES of
+        that many Monte Carlo dropout paths.
+        """
+        try:
+            if len(data) < self.min_training_size + self.lookback_period:
+                print(f"Warning: Limited data available. Predictions may be less accurate.")
 
-                # Create a new row with all features
-                # We'll use the predicted value for 'Close' and repeat the last known values for other features
-                new_row = np.zeros((1, self.last_scale_params['n_features']))
-                new_row[0, 0] = scaled_pred  # Set predicted Close price
-                new_row[0, 1:] = current_sequence[0, -1, 1:]  # Copy other features from last timestep
+            if entry is None and symbol is not None and self.registry is not None:
+                entry = self.load_symbol(symbol, data)
 
-                # Update the sequence by removing the first timestep and adding the new prediction
-                current_sequence = np.concatenate([
-                    current_sequence[0, 1:],
-                    new_row
-                ]).reshape(1, self.lookback_period, self.last_scale_params['n_features'])
+            if entry is not None:
+                scaler, forecaster = entry.scaler, entry.forecaster
+            else:
+                if self.model is None:
+                    if not self.train_model(data):
+                        raise ValueError("Failed to train model")
+                scaler, forecaster = self.scaler, self.forecaster
 
-            # Prepare for inverse transform
-            predictions = np.array(predictions).reshape(-1, 1)
-            dummy_features = np.zeros((len(predictions), self.last_scale_params['n_features'] - 1))
-            full_scaled_predictions = np.hstack([predictions, dummy_features])
+            # The window ending at the latest bar, so day 1 is the first bar after the data
+            window = self.latest_window(data, scaler, forecaster.lookback_period, symbol)
+            if window is None:
+                raise ValueError("Failed to prepare prediction data")
 
-            # Inverse transform to get actual prices
-            actual_predictions = self.scaler.inverse_transform(full_scaled_predictions)[:, 0]
+            # Roll the window forward in a single compiled call; each step feeds
+            # the predicted Close back in and repeats the last known values for other features
+            if samples:
+                # The dropout paths run as one batch of `samples` windows
+                predictions = forecast_intervals(forecaster, window, days, samples)[0]
+            else:
+                predictions = forecaster.forecast(window, days)[0].reshape(-1, 1)
 
-            return actual_predictions.reshape(-1, 1)
+            # RobustScaler's inverse for the Close column alone
+            return predictions.astype(np.float64) * scaler.scale_[0] + scaler.center_[0]
 
         except Exception as e:
             print(f"Error in predict_future: {str(e)}")
             return None
 
+    @metrics.timed('fundamentals')
     def calculate_fundamentals(self, ticker):
         """Calculate fundamental metrics for the stock"""
         try:
@@ -341,70 +563,232 @@ class StockPredictor:
             print(f"Error calculating fundamentals: {str(e)}")
             return {}
 
+def fetch_fundamentals(symbol):
+    """Fundamentals of an IDX symbol from Yahoo Finance"""
+    import yfinance as yf
+
+    return predictor.calculate_fundamentals(yf.Ticker(f"{symbol}.JK"))
+
+
+def global_entry_for(symbol):
+    """The shared model when GLOBAL_MODEL is on and it was trained on ``symbol``, else None"""
+    if not GLOBAL_MODEL:
+        return None
+    entry = predictor.registry.get_global()
+    return entry if entry is not None and symbol in entry else None
+
+@metrics.timed('forecast')
+def forecast_stage(hist_data, days, symbol, samples=0):
+    """Forecast stage of /stock/<symbol>: predictions plus the metrics of the model that made them"""
+    shared = global_entry_for(symbol)
+    if shared is not None:
+        features = predictor.add_features(hist_data, symbol)
+        predictions = shared.forecast({symbol: features}, days, samples)[symbol.upper()]
+        return predictions.reshape(days, -1), shared.accuracy.get(symbol.upper())
+
+    entry = predictor.load_symbol(symbol, hist_data)
+    predictions = predictor.predict_future(hist_data, days=days, symbol=symbol, entry=entry, samples=samples)
+    if predictions is None:
+        raise ValueError("Failed to generate predictions")
+    return predictions, entry.accuracy
+
+def prediction_points(last_date, predictions):
+    """``predictionData`` entries for consecutive calendar days after ``last_date``
+
+    Rows with interval columns after the forecast also get ``p10``/``p50``/``p90``.
+    """
+    bands = [f"p{percentile}" for percentile in INTERVAL_PERCENTILES]
+    return [{
+        'date': (last_date + timedelta(days=x)).strftime('%Y-%m-%d'),
+        'prediction': int(pred[0]),
+        **{band: int(value) for band, value in zip(bands, pred[1:])},
+    } for x, pred in enumerate(predictions, start=1)]
+
+def build_stock_payload(symbol, days=DEFAULT_FORECAST_DAYS, timeouts=STAGE_TIMEOUTS,
+                        since=None, limit=None, compact=False, samples=0):
+    """Compute the /stock/<symbol> response body, or None if there is no data for the symbol"""
+    # Fundamentals only need the symbol, so start them before anything else
+    started = time.monotonic()
+    stages = {'fundamentals': stage_runner.submit(fundamentals_cache.get, symbol.upper())}
+
+    # Historical data comes from the local bar store - 5 years for more training data
+    with metrics.span('history'):
+        hist_data = bar_store.history(symbol, period="5y")
+
+    if hist_data.empty:
+        return None
+
+    stages['forecast'] = stage_runner.submit(forecast_stage, hist_data, days, symbol, samples)
+
+    # Prepare historical data column-wise, trimmed to the requested range
+    with metrics.span('serialize'):
+        historical_data = history_payload(
+            select_range(history_columns(hist_data), since, limit), compact
+        )
+
+    # Technical metrics come from the same cached indicator state as the model features
+    with metrics.span('technical_metrics'):
+        technical_metrics = indicator_engine.technical_metrics(symbol, hist_data)
+
+    # Collect the concurrent stages; anything that failed or timed out is reported, not fatal
+    results, unavailable = stage_runner.gather(stages, timeouts, started)
+    fundamentals = results.get('fundamentals', {})
+    predictions, model_metrics = results.get('forecast', ([], None))
+
+    # Add predictions
+    prediction_data = prediction_points(hist_data.index[-1], predictions)
+
+    return {
+        'status': 'success',
+        'data': {
+            'name': symbol,
+            'currentPrice': int(hist_data['Close'].iloc[-1]),
+            'historicalData': historical_data,
+            'predictionData': prediction_data,
+            'fundamentals': fundamentals,
+            'modelMetrics': model_metrics,
+            'technicalMetrics': technical_metrics,
+            'unavailable': unavailable,
+        }
+    }
+
 @app.route('/stock/<symbol>', methods=['GET'])
 def get_stock_data(symbol):
     try:
-        # Fetch historical data - increased to 5 years for more training data
-        stock = yf.Ticker(f"{symbol}.JK")
-        hist_data = stock.history(period="5y")
+        days = request.args.get('days', DEFAULT_FORECAST_DAYS, type=int)
+        if not 1 <= days <= MAX_FORECAST_DAYS:
+            return jsonify({
+                'status': 'error',
+                'message': f'days must be between 1 and {MAX_FORECAST_DAYS}'
+            }), 400
 
-        if hist_data.empty:
+        # Monte Carlo dropout paths for p10/p50/p90 bands; 0 returns the forecast alone
+        samples = request.args.get('samples', 0, type=int)
+        if not 0 <= samples <= MAX_DROPOUT_SAMPLES:
+            return jsonify({
+                'status': 'error',
+                'message': f'samples must be between 0 and {MAX_DROPOUT_SAMPLES}'
+            }), 400
+
+        # Optional history range and column-oriented shape
+        since = request.args.get('since')
+        limit = request.args.get('limit', type=int)
+        compact = request.args.get('format') == 'compact'
+        if since is not None:
+            try:
+                datetime.strptime(since, '%Y-%m-%d')
+            except ValueError:
+                return jsonify({'status': 'error', 'message': 'since must be YYYY-MM-DD'}), 400
+        if limit is not None and limit < 1:
+            return jsonify({'status': 'error', 'message': 'limit must be positive'}), 400
+
+        # Optionally hand cold symbols to a background training job instead of blocking on model.fit
+        if ASYNC_COLD_START and not predictor.registry.exists(symbol) and global_entry_for(symbol) is None:
+            try:
+                job = jobs.submit('train', lambda job: run_train_job(job, symbol.upper()),
+                                  symbol=symbol.upper(), key=('train', symbol.upper()))
+            except JobQueueFull as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 429
+            return job_accepted(job)
+
+        # Default-horizon requests are served from the nightly snapshot when one exists
+        if days == DEFAULT_FORECAST_DAYS and not samples:
+            snapshot = snapshot_store.read(symbol)
+            if snapshot is not None:
+                if since is None and limit is None and not compact:
+                    return Response(snapshot, mimetype='application/json')
+
+                payload = loads(snapshot)
+                columns = records_to_columns(payload['data']['historicalData'])
+                payload['data']['historicalData'] = history_payload(
+                    select_range(columns, since, limit), compact
+                )
+                return json_response(payload)
+
+        # Concurrent identical requests share one computation
+        key = (symbol.upper(), date.today().isoformat(), days, since, limit, compact, samples)
+        payload = inflight.do(key, build_stock_payload, symbol, days, since=since, limit=limit, compact=compact,
+                              samples=samples)
+        if payload is None:
             return jsonify({
                 'status': 'error',
                 'message': 'No data found for this symbol'
             }), 404
 
-        # Get predictions
-        predictions = predictor.predict_future(hist_data)
-        if predictions is None:
-            raise ValueError("Failed to generate predictions")
-
-        # Generate future dates
-        last_date = hist_data.index[-1]
-        future_dates = [last_date + timedelta(days=x) for x in range(1, 31)]
-
-        # Prepare historical data
-        historical_data = [{
-            'date': index.strftime('%Y-%m-%d'),
-            'price': int(row['Close']),
-            'volume': int(row['Volume'])
-        } for index, row in hist_data.iterrows()]
-
-        # Add predictions
-        prediction_data = [{
-            'date': date.strftime('%Y-%m-%d'),
-            'prediction': int(pred[0]),
-        } for date, pred in zip(future_dates, predictions)]
-
-        # Calculate fundamental metrics
-        fundamentals = predictor.calculate_fundamentals(stock)
-
-        # Calculate technical metrics
-        latest_price = float(hist_data['Close'].iloc[-1])
-        sma_50 = float(hist_data['Close'].rolling(window=50).mean().iloc[-1])
-        sma_200 = float(hist_data['Close'].rolling(window=200).mean().iloc[-1])
-
-        technical_metrics = {
-            'sma50': sma_50,
-            'sma200': sma_200,
-            'priceToSMA50': (latest_price / sma_50 - 1) * 100,
-            'priceToSMA200': (latest_price / sma_200 - 1) * 100,
-            'volumeAvg20': int(hist_data['Volume'].rolling(window=20).mean().iloc[-1]),
-            'volatility20': float(hist_data['Close'].pct_change().std() * np.sqrt(252) * 100)
-        }
+        return json_response(payload)
 
+    except Exception as e:
         return jsonify({
-            'status': 'success',
-            'data': {
-                'name': symbol,
-                'currentPrice': int(hist_data['Close'].iloc[-1]),
-                'historicalData': historical_data,
-                'predictionData': prediction_data,
-                'fundamentals': fundamentals,
-                'modelMetrics': predictor.last_accuracy,
-                'technicalMetrics': technical_metrics,
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+def build_forecasts(symbols, days, samples=0):
+    """Forecasts for many symbols from one batched rollout of the shared model"""
+    shared = predictor.registry.get_global()
+    features, unavailable = {}, {}
+    for symbol in symbols:
+        if symbol not in shared:
+            unavailable[symbol] = 'not in the global model'
+            continue
+        hist_data = bar_store.history(symbol, period="5y")
+        if hist_data.empty:
+            unavailable[symbol] = 'No data found for this symbol'
+            continue
+        features[symbol] = (hist_data.index[-1], predictor.add_features(hist_data, symbol))
+
+    forecasts = {}
+    if features:
+        with metrics.span('forecast_batch'):
+            predictions = shared.forecast({symbol: frame for symbol, (_, frame) in features.items()}, days, samples)
+        for symbol, (last_date, _) in features.items():
+            forecasts[symbol] = {
+                'predictionData': prediction_points(last_date, predictions[symbol].reshape(days, -1)),
+                'modelMetrics': shared.accuracy.get(symbol),
             }
-        })
+
+    return {
+        'status': 'success',
+        'data': {
+            'forecasts': forecasts,
+            'unavailable': unavailable,
+        }
+    }
+
+@app.route('/forecast', methods=['GET'])
+def get_forecasts():
+    """Forecasts for several symbols (default: all of DX_STOCKS) from the shared model"""
+    try:
+        days = request.args.get('days', DEFAULT_FORECAST_DAYS, type=int)
+        if not 1 <= days <= MAX_FORECAST_DAYS:
+            return jsonify({
+                'status': 'error',
+                'message': f'days must be between 1 and {MAX_FORECAST_DAYS}'
+            }), 400
+
+        samples = request.args.get('samples', 0, type=int)
+        if not 0 <= samples <= MAX_DROPOUT_SAMPLES:
+            return jsonify({
+                'status': 'error',
+                'message': f'samples must be between 0 and {MAX_DROPOUT_SAMPLES}'
+            }), 400
+
+        if not GLOBAL_MODEL or predictor.registry.get_global() is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'Multi-symbol forecasts need the global model (GLOBAL_MODEL=1, trained with services.global_model)'
+            }), 503
+
+        requested = request.args.get('symbols')
+        symbols = [s.strip().upper() for s in requested.split(',') if s.strip()] if requested else list(DX_STOCKS)
+        if len(symbols) * samples > MAX_DROPOUT_WINDOWS:
+            return jsonify({
+                'status': 'error',
+                'message': f'symbols times samples must be at most {MAX_DROPOUT_WINDOWS}'
+            }), 400
+
+        key = ('forecast', tuple(symbols), date.today().isoformat(), days, samples)
+        return json_response(inflight.do(key, build_forecasts, symbols, days, samples))
 
     except Exception as e:
         return jsonify({
@@ -412,7 +796,172 @@ def get_stock_data(symbol):
             'message': str(e)
         }), 500
 
-predictor = StockPredictor()
+def run_train_job(job, symbol):
+    """Train job: fit and save a fresh model for the symbol, reporting epoch progress"""
+    hist_data = bar_store.history(symbol, period="5y")
+    if hist_data.empty:
+        raise ValueError('No data found for this symbol')
+
+    entry = predictor.train_symbol(symbol, hist_data, callbacks=[jobs.callback(job)])
+    return {
+        'symbol': entry.symbol,
+        'modelMetrics': entry.accuracy,
+        'trainedAt': entry.meta['trained_at'],
+    }
+
+def run_forecast_job(job, symbol, days):
+    """Forecast job: the /stock payload, training first (with progress) if the symbol has no model"""
+    hist_data = bar_store.history(symbol, period="5y")
+    if hist_data.empty:
+        raise ValueError('No data found for this symbol')
+
+    predictor.load_symbol(symbol, hist_data, callbacks=[jobs.callback(job)])
+    return build_stock_payload(symbol, days, timeouts=BACKGROUND_STAGE_TIMEOUTS)['data']
+
+def job_accepted(job):
+    response = jsonify({'status': 'success', 'data': job.to_dict()})
+    response.status_code = 202
+    response.headers['Location'] = f"/jobs/{job.id}"
+    return response
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    body = request.get_json(silent=True) or {}
+    kind = body.get('type')
+    symbol = str(body.get('symbol') or '').upper()
+    days = body.get('days', DEFAULT_FORECAST_DAYS)
+
+    if kind not in ('train', 'forecast') or not symbol:
+        return jsonify({
+            'status': 'error',
+            'message': "Body must include 'symbol' and a 'type' of 'train' or 'forecast'"
+        }), 400
+    if not isinstance(days, int) or not 1 <= days <= MAX_FORECAST_DAYS:
+        return jsonify({
+            'status': 'error',
+            'message': f'days must be between 1 and {MAX_FORECAST_DAYS}'
+        }), 400
+
+    try:
+        if kind == 'train':
+            job = jobs.submit(kind, lambda job: run_train_job(job, symbol),
+                              symbol=symbol, key=(kind, symbol))
+        else:
+            job = jobs.submit(kind, lambda job: run_forecast_job(job, symbol, days),
+                              symbol=symbol, key=(kind, symbol, days))
+    except JobQueueFull as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 429
+
+    return job_accepted(job)
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    return jsonify({'status': 'success', 'data': job.to_dict()})
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    if not job.finished:
+        return jsonify({'status': 'success', 'data': job.to_dict()}), 202
+    if job.error is not None:
+        return jsonify({'status': 'error', 'message': job.error}), 500
+    return json_response({'status': 'success', 'data': job.result})
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job(job_id):
+    """Server-sent events with the job state on every change until it finishes"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+
+    def events():
+        # The job may run in another worker, so every change is read back from the job store
+        current, version = job, -1
+        while current is not None:
+            if current.version > version:
+                version = current.version
+                yield f"data: {dumps(current.to_dict()).decode()}\n\n"
+                if current.finished:
+                    break
+            current = jobs.wait(job_id, version)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+
+@app.route('/healthz', methods=['GET'])
+def health():
+    """Liveness: the process is up and serving, whether or not it has warmed up"""
+    return jsonify({'status': 'success', 'data': readiness.to_dict()})
+
+
+@app.route('/readyz', methods=['GET'])
+def ready():
+    """Readiness: 503 until the warmup steps have run"""
+    # A server started without the post-fork hook warms up on its first probe
+    readiness.start(warmup_steps())
+    if not readiness.ready:
+        return jsonify({'status': 'error', 'message': 'Warming up', 'data': readiness.to_dict()}), 503
+    return jsonify({'status': 'success', 'data': readiness.to_dict()})
+
+
+def import_dependencies():
+    """Import what the first request would otherwise load"""
+    import pandas
+    import sklearn.metrics
+    import sklearn.preprocessing
+    import yfinance
+    if SERVING_RUNTIME != 'numpy':
+        import services.forecasting
+
+
+def warmup_steps():
+    """``[(name, fn)]`` run after startup before the process reports ready"""
+    steps = [('imports', import_dependencies)]
+    for symbol in PRELOAD_SYMBOLS:
+        steps.append((f"model:{symbol}", lambda symbol=symbol: warm_symbol(symbol)))
+    if GLOBAL_MODEL:
+        steps.append(('model:global', lambda: warm_symbol(None)))
+    return steps
+
+
+def warm_symbol(symbol):
+    entry = predictor.registry.get(symbol) if symbol else predictor.registry.get_global()
+    if entry is None:
+        print(f"No trained model to preload for {symbol or 'the global model'}")
+        return
+    warm_entry(entry)
+
+
+bar_store = BarStore()
+indicator_engine = IndicatorEngine()
+snapshot_store = SnapshotStore()
+inflight = SingleFlight()
+jobs = JobManager(max_workers=JOB_WORKERS, max_queued=JOB_QUEUE_SIZE)
+stage_runner = StageRunner(max_workers=int(os.environ.get('STAGE_WORKERS', 8)))
+predictor = StockPredictor(registry=ModelRegistry(), indicators=indicator_engine)
+fundamentals_cache = TTLCache(
+    fetch_fundamentals,
+    ttl=FUNDAMENTALS_TTL,
+    disk_dir=FUNDAMENTALS_CACHE_DIR or None,
+    name='fundamentals',
+)
+readiness = Readiness()
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='BursaLens prediction API')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Print import and warmup costs, then exit without serving')
+    args = parser.parse_args()
+    if args.profile_startup:
+        raise SystemExit(profile_startup('app', warmup_steps(), cwd=os.path.dirname(os.path.abspath(__file__))))
+
+    # The debug reloader re-runs this file in a child process; only the child serves
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        readiness.start(warmup_steps())
     app.run(host='0.0.0.0', debug=True)
\ No newline at end of file
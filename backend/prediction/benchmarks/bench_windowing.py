@@ -0,0 +1,53 @@
+"""Micro-benchmark: list-append window construction vs strided views.
+
+Uses a synthetic history the length of the 2010-onward download in
+``services/train_model.py``. Run from ``backend/prediction``::
+
+    python -m benchmarks.bench_windowing
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.timing import measure
+from services.windowing import make_sequences
+
+
+def legacy_sequences(data, lookback):
+    """The list-append loop previously used by prepare_data"""
+    X, y = [], []
+    for i in range(lookback, len(data)):
+        X.append(data[i-lookback:i])
+        y.append(data[i, 0])
+    return np.array(X), np.array(y)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=4000,
+                        help='Daily bars (default ~2010 to today)')
+    parser.add_argument('--features', type=int, default=9)
+    parser.add_argument('--lookbacks', type=int, nargs='+', default=[30, 60])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    data = np.random.default_rng(0).standard_normal((args.rows, args.features))
+
+    print(f"{'lookback':>8} {'method':<22} {'time ms':>10} {'peak MB':>10}")
+    for lookback in args.lookbacks:
+        cases = {
+            'list append': lambda: legacy_sequences(data, lookback),
+            'strided view': lambda: make_sequences(data, lookback),
+            'view + float32 copy': lambda: make_sequences(data, lookback, materialize=True),
+        }
+
+        expected, _ = legacy_sequences(data, lookback)
+        assert np.array_equal(expected, make_sequences(data, lookback)[0])
+
+        for name, fn in cases.items():
+            elapsed, peak = measure(fn, args.repeat)
+            print(f"{lookback:>8} {name:<22} {elapsed:>10.2f} {peak:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
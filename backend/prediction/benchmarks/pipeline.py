@@ -0,0 +1,232 @@
+"""Benchmark: every stage of the /stock pipeline on synthetic OHLCV data.
+
+Times and memory-profiles add_features, prepare_data, create_model, one fit
+epoch, predict_future (also with Monte Carlo dropout intervals),
+calculate_accuracy_metrics and the route's JSON assembly. It runs across
+history lengths and lookbacks, with no network access. Run from
+``backend/prediction``::
+
+    python -m benchmarks.pipeline --output results.json
+    python -m benchmarks.pipeline --save-baseline benchmarks/baseline.json
+    python -m benchmarks.pipeline --baseline benchmarks/baseline.json --threshold 0.2
+
+With ``--baseline`` the run exits with status 1 when any stage is slower
+than the baseline by more than ``--threshold`` (and by more than
+``--min-delta-ms``, so sub-millisecond jitter does not count).
+
+Peak memory is what tracemalloc sees: Python and NumPy allocations.
+TensorFlow's own allocator is not included, so the TF stages also report
+the process's peak RSS.
+"""
+import argparse
+import json
+import platform
+import resource
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from tensorflow.keras.callbacks import Callback
+
+from benchmarks.timing import measure
+
+HISTORIES = {'1y': 252, '5y': 5 * 252, '15y': 15 * 252}
+# Dropout paths behind the predict_intervals stage, as in /stock/<symbol>?samples=100
+INTERVAL_SAMPLES = 100
+
+
+def synthetic_ohlcv(rows, seed=0, end='2025-12-31'):
+    """Business-day OHLCV bars following a geometric random walk from 5000"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=end, periods=rows, tz='Asia/Jakarta')
+    close = 5000 * np.exp(np.cumsum(rng.normal(0, 0.015, rows)))
+    spread = np.abs(rng.normal(0, 0.01, rows))
+    return pd.DataFrame({
+        'Open': close * (1 + rng.normal(0, 0.005, rows)),
+        'High': close * (1 + spread),
+        'Low': close * (1 - spread),
+        'Close': close,
+        'Volume': rng.integers(1_000_000, 50_000_000, rows).astype(float),
+        'Dividends': 0.0,
+        'Stock Splits': 0.0,
+    }, index=index)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+class EpochTimer(Callback):
+    """Keras callback that records the wall time of every epoch"""
+
+    def __init__(self):
+        super().__init__()
+        self.durations = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._started = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.durations.append(time.perf_counter() - self._started)
+
+
+def bench_case(df, lookback, epochs, repeat, days):
+    """Stage timings for one history and lookback, as result rows without the case keys"""
+    from app import StockPredictor, prediction_points
+    from services.forecasting import Forecaster
+    from services.indicators import IndicatorEngine
+    from services.serialize import dumps, history_columns, history_payload
+    from services.windowing import window_dataset
+
+    rows = []
+
+    def record(stage, elapsed, peak, **extra):
+        rows.append({'stage': stage, 'time_ms': round(elapsed, 3), 'peak_mb': round(peak, 3), **extra})
+
+    predictor = StockPredictor()
+    predictor.lookback_period = lookback
+
+    record('add_features', *measure(lambda: predictor.add_features(df), repeat))
+    record('prepare_data', *measure(lambda: predictor.prepare_data(df), repeat))
+    X, y, feature_columns = predictor.prepare_data(df)
+
+    record('create_model', *measure(lambda: predictor.create_model((lookback, len(feature_columns))), 1))
+    model = predictor.create_model((lookback, len(feature_columns)))
+
+    # The same tf.data input pipeline as train_model
+    split_idx = int(len(X) * (1 - predictor.validation_split))
+    y_val = y[split_idx:]
+    val_data = window_dataset(X[split_idx:], y_val, batch_size=32, cache=True)
+    timer = EpochTimer()
+    model.fit(window_dataset(X[:split_idx], y[:split_idx], batch_size=32, shuffle=True),
+              validation_data=val_data, epochs=epochs, verbose=0, callbacks=[timer])
+    # The first epoch includes graph tracing; report it separately from the steady state
+    steady = timer.durations[1:] or timer.durations
+    record('fit_first_epoch', timer.durations[0] * 1000, 0.0, rss_mb=round(peak_rss_mb(), 1))
+    record('fit_epoch', statistics.median(steady) * 1000, 0.0, rss_mb=round(peak_rss_mb(), 1))
+
+    predictor.model = model
+    predictor.forecaster = Forecaster(model, lookback, len(feature_columns))
+    # Warm the compiled rollout once so the timing covers serving, not tracing
+    predictor.predict_future(df, days=days)
+    record('predict_future', *measure(lambda: predictor.predict_future(df, days=days), repeat),
+           rss_mb=round(peak_rss_mb(), 1))
+    predictor.predict_future(df, days=days, samples=INTERVAL_SAMPLES)
+    record('predict_intervals',
+           *measure(lambda: predictor.predict_future(df, days=days, samples=INTERVAL_SAMPLES), repeat),
+           rss_mb=round(peak_rss_mb(), 1))
+
+    y_pred = model.predict(val_data, verbose=0).ravel()
+    scale, center = predictor.scaler.scale_[0], predictor.scaler.center_[0]
+    y_true_actual, y_pred_actual = y_val * scale + center, y_pred * scale + center
+    record('calculate_accuracy_metrics',
+           *measure(lambda: predictor.calculate_accuracy_metrics(y_true_actual, y_pred_actual), repeat))
+
+    predictions = predictor.predict_future(df, days=days)
+    engine = IndicatorEngine()
+
+    def assemble():
+        # The route's response shaping: history columns, technical metrics, prediction points, encoding
+        return dumps({
+            'status': 'success',
+            'data': {
+                'name': 'BENCH',
+                'currentPrice': int(df['Close'].iloc[-1]),
+                'historicalData': history_payload(history_columns(df)),
+                'predictionData': prediction_points(df.index[-1], predictions),
+                'fundamentals': {},
+                'modelMetrics': None,
+                'technicalMetrics': engine.technical_metrics('BENCH', df),
+                'unavailable': {},
+            }
+        })
+
+    record('json_assembly', *measure(assemble, repeat))
+    return rows
+
+
+def run(histories, lookbacks, epochs, repeat, days):
+    results = []
+    for history in histories:
+        df = synthetic_ohlcv(HISTORIES[history])
+        for lookback in lookbacks:
+            for row in bench_case(df, lookback, epochs, repeat, days):
+                results.append({'history': history, 'rows': len(df), 'lookback': lookback, **row})
+                print(f"{history:>4} {lookback:>8} {row['stage']:<28} {row['time_ms']:>12.2f} {row['peak_mb']:>10.2f}")
+
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'tensorflow': tf.__version__,
+            'epochs': epochs,
+            'repeat': repeat,
+            'days': days,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold, min_delta_ms):
+    """Rows of ``current`` slower than ``baseline`` beyond the threshold"""
+    previous = {(row['history'], row['lookback'], row['stage']): row['time_ms'] for row in baseline['results']}
+    regressions = []
+    for row in current['results']:
+        before = previous.get((row['history'], row['lookback'], row['stage']))
+        if before is None:
+            continue
+        if row['time_ms'] > before * (1 + threshold) and row['time_ms'] - before > min_delta_ms:
+            regressions.append({**row, 'baseline_ms': before})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--histories', nargs='+', choices=list(HISTORIES), default=list(HISTORIES))
+    parser.add_argument('--lookbacks', type=int, nargs='+', default=[30, 60])
+    parser.add_argument('--epochs', type=int, default=3,
+                        help='Fit epochs per case; the first one is reported separately')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--days', type=int, default=30, help='Forecast horizon for predict_future')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--baseline', help='Fail on regressions against this results file')
+    parser.add_argument('--save-baseline', help='Write the results as the new baseline to this file')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed slowdown as a fraction of the baseline (default 0.2)')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='Ignore slowdowns smaller than this many milliseconds')
+    args = parser.parse_args(argv)
+
+    print(f"{'hist':>4} {'lookback':>8} {'stage':<28} {'time ms':>12} {'peak MB':>10}")
+    current = run(args.histories, args.lookbacks, args.epochs, args.repeat, args.days)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(current, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold, args.min_delta_ms)
+        for row in regressions:
+            print(f"REGRESSION {row['history']} lookback={row['lookback']} {row['stage']}: "
+                  f"{row['baseline_ms']:.2f} ms -> {row['time_ms']:.2f} ms")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,18 @@
+"""Timing helpers shared by the benchmark scripts."""
+import time
+import tracemalloc
+
+
+def measure(fn, repeat):
+    """Return (best wall time in ms, peak traced allocation in MB)"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / 1024 ** 2
@@ -0,0 +1,22 @@
+"""Production server settings: ``gunicorn -c gunicorn.conf.py app:app``
+
+The app is imported once in the master (cheap, since the heavy libraries
+are lazy) and forked into the workers. Each worker then warms up on its own
+thread, as TensorFlow state and thread pools do not survive a fork, while
+already answering /healthz. /readyz turns 200 once its warmup is done.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 80)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+# Cold /stock requests can train a model inline
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 300))
+preload_app = True
+
+
+def post_worker_init(worker):
+    from app import readiness, warmup_steps
+
+    readiness.start(warmup_steps())
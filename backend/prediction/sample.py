@@ -2,11 +2,14 @@ from flask import Flask, jsonify
 from flask_cors import CORS
 import numpy as np
 import pandas as pd
-import yfinance as yf
 from datetime import timedelta
 from sklearn.preprocessing import MinMaxScaler
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout
+from services.datastore import BarStore
+from services.forecasting import Forecaster
+from services.serialize import history_columns
+from services.windowing import make_sequences
 
 app = Flask(__name__)
 CORS(app)
@@ -37,11 +40,11 @@ IDX_STOCKS = {
     'WIKA': 'Wijaya Karya',
 }
 
+bar_store = BarStore()
+
 def get_stock_data(symbol, period='2y'):
-    """Fetch stock data from Yahoo Finance"""
-    stock = yf.Ticker(f"{symbol}.JK")
-    data = stock.history(period=period)
-    return data
+    """Read stock data from the local bar store, fetching only the missing tail"""
+    return bar_store.history(symbol, period=period)
 
 def add_technical_indicators(df):
     """Add technical indicators to the dataframe"""
@@ -61,12 +64,7 @@ def prepare_data(data, lookback=60):
     """Prepare data for LSTM model"""
     scaler = MinMaxScaler()
     scaled_data = scaler.fit_transform(data['Close'].values.reshape(-1, 1))
-    X, y = [], []
-    for i in range(lookback, len(scaled_data)):
-        X.append(scaled_data[i-lookback:i, 0])
-        y.append(scaled_data[i, 0])
-    X, y = np.array(X), np.array(y)
-    X = np.reshape(X, (X.shape[0], X.shape[1], 1))
+    X, y = make_sequences(scaled_data, lookback, materialize=True)
     return X, y, scaler
 
 def create_model(input_shape):
@@ -97,21 +95,16 @@ def predict_stock(symbol):
         predictions = model.predict(X_test)
         predictions = scaler.inverse_transform(predictions)
         actual = scaler.inverse_transform(y_test.reshape(-1, 1))
-        last_sequence = X[-1]
         future_days = 30
-        future_predictions = []
-        for _ in range(future_days):
-            next_pred = model.predict(last_sequence.reshape(1, X.shape[1], 1))
-            future_predictions.append(next_pred[0, 0])
-            last_sequence = np.roll(last_sequence, -1)
-            last_sequence[-1] = next_pred
+        future_predictions = Forecaster(model, X.shape[1], 1).forecast(X[-1], future_days)[0]
         future_predictions = scaler.inverse_transform(np.array(future_predictions).reshape(-1, 1))
         last_date = data.index[-1]
         future_dates = [last_date + timedelta(days=x) for x in range(1, future_days + 1)]
         prediction_data = [{'date': date.strftime('%Y-%m-%d'), 'prediction': int(pred[0])} for date, pred in zip(future_dates, future_predictions)]
         
         # Prepare historical data
-        historical_data = [{'date': index.strftime('%Y-%m-%d'), 'price': int(row['Close'])} for index, row in data.iterrows()]
+        columns = history_columns(data)
+        historical_data = [{'date': date, 'price': price} for date, price in zip(columns['dates'], columns['prices'])]
         
         return jsonify({'status': 'success', 'predictions': prediction_data, 'historical_data': historical_data})
     except Exception as e:
@@ -0,0 +1,327 @@
+"""Walk-forward backtests of the per-symbol LSTM.
+
+A single 80/20 split gives one noisy accuracy figure. The backtest instead
+takes the last ``folds`` complete calendar months as test blocks. For each
+fold it trains a fresh model on the ``train_size`` windows just before the
+month, with a scaler fitted on those rows only. It then forecasts ``horizon``
+days ahead from every trading day of the month. All origins of a fold go
+through one batched rollout, and the metrics of every fold and horizon step
+come from one vectorized ``accuracy_metrics`` call.
+
+Features and windows are built once per symbol, as strided views over the
+unscaled feature rows; each fold only scales the slices it uses. Fold
+results (actual and predicted prices per origin) are stored under
+``BACKTEST_DIR/<version>/<SYMBOL>/<YYYY-MM>.json`` together with a key over
+the configuration and the feature rows the fold read. A rerun skips every
+fold whose key is unchanged, so a daily run only evaluates new months or
+months whose history was restated (e.g. after a split). Run from
+``backend/prediction``::
+
+    python -m services.backtest --symbols BBCA BBRI --workers 2
+    python -m services.backtest --folds 12 --horizon 10
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from services.datastore import DEFAULT_DATA_DIR, atomic_write
+from services.registry import FEATURE_VERSION
+from services.windowing import sliding_windows
+
+BACKTEST_DIR = os.environ.get('BACKTEST_DIR', os.path.join(DEFAULT_DATA_DIR, 'backtests'))
+DEFAULT_CONFIG = {
+    'folds': 6,
+    'horizon': 5,
+    # About three years of daily windows
+    'train_size': 750,
+    'epochs': 30,
+    'lookback': 30,
+}
+# Fewer training windows than this and a month is not backtested, as in StockPredictor.min_training_size
+MIN_TRAIN_WINDOWS = 100
+# Forecasts within this fraction of the actual price count towards threshold_accuracy
+ACCURACY_THRESHOLD = 0.02
+SUMMARY_FILE = 'summary.json'
+
+
+def accuracy_metrics(y_true, y_pred, threshold=ACCURACY_THRESHOLD):
+    """The modelMetrics of ``calculate_accuracy_metrics`` over the last axis, for any leading shape
+
+    NaN marks padding: ragged folds can be stacked into one array and
+    evaluated in a single call. Returns ``{name: array of the leading shape}``.
+    """
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_pred = np.asarray(y_pred, dtype=np.float64)
+    valid = ~(np.isnan(y_true) | np.isnan(y_pred))
+    true = np.where(valid, y_true, 0.0)
+    pred = np.where(valid, y_pred, 0.0)
+    count = valid.sum(axis=-1)
+
+    def masked_mean(values, mask):
+        return np.where(mask, values, 0.0).sum(axis=-1) / mask.sum(axis=-1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        error = true - pred
+        # Same guard against zero prices as sklearn's mean_absolute_percentage_error
+        mape = masked_mean(np.abs(error) / np.maximum(np.abs(true), np.finfo(np.float64).eps), valid) * 100
+
+        ss_res = np.where(valid, error ** 2, 0.0).sum(axis=-1)
+        centered = true - masked_mean(true, valid)[..., np.newaxis]
+        ss_tot = np.where(valid, centered ** 2, 0.0).sum(axis=-1)
+        # sklearn's r2_score convention for a constant target
+        r2 = np.where(ss_tot > 0, 1 - ss_res / ss_tot, np.where(ss_res == 0, 1.0, 0.0))
+
+        pairs = valid[..., 1:] & valid[..., :-1]
+        same_direction = np.sign(np.diff(true, axis=-1)) == np.sign(np.diff(pred, axis=-1))
+        directional_accuracy = masked_mean(same_direction, pairs) * 100
+
+        rmse = np.sqrt(ss_res / count)
+        within_threshold = np.abs(error / true) <= threshold
+        threshold_accuracy = masked_mean(within_threshold, valid) * 100
+
+    return {
+        'mape': mape,
+        'r2_score': r2 * 100,
+        'directional_accuracy': directional_accuracy,
+        'rmse': rmse,
+        'threshold_accuracy': threshold_accuracy,
+    }
+
+
+def plan_folds(target_dates, n_windows, config):
+    """``[(month, first_origin, end_origin)]`` for the last complete months with a full horizon
+
+    Window ``i`` predicts the bar at ``target_dates[i]``; a month is complete
+    once a later month has started.
+    """
+    months = target_dates.strftime('%Y-%m')
+    last_usable = n_windows - config['horizon']
+    folds = []
+    boundaries = np.flatnonzero(months[1:] != months[:-1]) + 1
+    starts = np.concatenate([[0], boundaries])
+    ends = np.concatenate([boundaries, [len(months)]])
+    # The final month is still in progress
+    for start, end in zip(starts[:-1], ends[:-1]):
+        if start >= MIN_TRAIN_WINDOWS and end - 1 <= last_usable:
+            folds.append((months[start], int(start), int(end)))
+    return folds[-config['folds']:]
+
+
+def fold_key(feature_values, train_start, end, config):
+    """Hash of the configuration and every feature row the fold reads"""
+    last_row = end - 1 + config['lookback'] + config['horizon']
+    # How many folds are evaluated does not change any one of them
+    settings = {name: value for name, value in config.items() if name != 'folds'}
+    digest = hashlib.sha1(json.dumps(settings, sort_keys=True).encode())
+    digest.update(FEATURE_VERSION.encode())
+    digest.update(np.ascontiguousarray(feature_values[train_start:last_row]).tobytes())
+    return digest.hexdigest()
+
+
+def run_fold(predictor, feature_values, windows, closes, train_start, start, end, config):
+    """Train on windows ``[train_start, start)``; return (actual, predicted) prices of shape (origins, horizon)"""
+    from sklearn.preprocessing import RobustScaler
+    from tensorflow.keras.callbacks import EarlyStopping
+
+    from services.forecasting import Forecaster
+
+    lookback, horizon = config['lookback'], config['horizon']
+    # Fit on the rows the training windows cover, so nothing after the origin leaks into the scale
+    scaler = RobustScaler().fit(feature_values[train_start:start - 1 + lookback])
+    center, scale = scaler.center_.astype(np.float32), scaler.scale_.astype(np.float32)
+
+    X_train = (windows[train_start:start] - center) / scale
+    y_train = (closes[train_start:start] - center[0]) / scale[0]
+    model = predictor.create_model((lookback, windows.shape[2]))
+    model.fit(
+        X_train, y_train,
+        validation_split=predictor.validation_split,
+        epochs=config['epochs'],
+        batch_size=32,
+        verbose=0,
+        callbacks=[EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True)]
+    )
+
+    # Every origin of the month in one batched rollout
+    X_test = (windows[start:end] - center) / scale
+    predicted = Forecaster(model, lookback, windows.shape[2]).forecast(X_test, horizon) * scale[0] + center[0]
+    actual = sliding_windows(closes, horizon)[start:end]
+    return actual, predicted
+
+
+def backtest_symbol(symbol, hist_data, config=None, directory=BACKTEST_DIR, force=False):
+    """Evaluate ``symbol`` over its walk-forward folds; return the summary that is also written to disk"""
+    from app import StockPredictor
+    from services.indicators import FEATURE_COLUMNS, compute_features
+
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    lookback = config['lookback']
+    target = os.path.join(directory, FEATURE_VERSION, symbol.upper())
+    os.makedirs(target, exist_ok=True)
+
+    features = compute_features(hist_data)[FEATURE_COLUMNS]
+    feature_values = features.to_numpy(dtype=np.float32)
+    # Built once; every fold slices these views
+    windows = sliding_windows(feature_values[:-1], lookback)
+    closes = feature_values[lookback:, 0]
+    target_dates = features.index[lookback:]
+
+    predictor = StockPredictor()
+    predictor.lookback_period = lookback
+    results = []
+    for month, start, end in plan_folds(target_dates, len(windows), config):
+        train_start = max(0, start - config['train_size'])
+        key = fold_key(feature_values, train_start, end, config)
+        path = os.path.join(target, f"{month}.json")
+
+        cached = None
+        if not force and os.path.exists(path):
+            with open(path) as f:
+                cached = json.load(f)
+        if cached is not None and cached['key'] == key:
+            results.append({**cached, 'cached': True})
+            continue
+
+        started = time.time()
+        actual, predicted = run_fold(predictor, feature_values, windows, closes, train_start, start, end, config)
+        result = {
+            'key': key,
+            'fold': month,
+            'trainStart': target_dates[train_start].strftime('%Y-%m-%d'),
+            'trainEnd': target_dates[start - 1].strftime('%Y-%m-%d'),
+            'origins': [date.strftime('%Y-%m-%d') for date in target_dates[start:end]],
+            'actual': actual.tolist(),
+            'predicted': predicted.tolist(),
+            'seconds': round(time.time() - started, 1),
+        }
+        atomic_write(path, lambda f: json.dump(result, f), mode='w')
+        results.append({**result, 'cached': False})
+
+    summary = summarize(symbol.upper(), results, config)
+    atomic_write(os.path.join(target, SUMMARY_FILE), lambda f: json.dump(summary, f, indent=2), mode='w')
+    return summary
+
+
+def summarize(symbol, results, config):
+    """Metrics for every fold and horizon step, computed in one vectorized pass"""
+    horizon = config['horizon']
+    if not results:
+        return {'symbol': symbol, 'config': config, 'folds': [], 'horizon': []}
+
+    # (folds, horizon, origins) with NaN padding for shorter months
+    longest = max(len(result['origins']) for result in results)
+    actual = np.full((len(results), horizon, longest), np.nan)
+    predicted = np.full_like(actual, np.nan)
+    for i, result in enumerate(results):
+        n = len(result['origins'])
+        actual[i, :, :n] = np.asarray(result['actual']).T
+        predicted[i, :, :n] = np.asarray(result['predicted']).T
+
+    per_fold = accuracy_metrics(actual, predicted)
+
+    def rounded(values):
+        return {name: round(float(value), 2) for name, value in values.items()}
+
+    return {
+        'symbol': symbol,
+        'config': config,
+        'folds': [
+            {
+                'fold': result['fold'],
+                'trainStart': result['trainStart'],
+                'trainEnd': result['trainEnd'],
+                'origins': len(result['origins']),
+                'cached': result['cached'],
+                # One-day-ahead metrics, comparable to modelMetrics
+                'metrics': rounded({name: values[i, 0] for name, values in per_fold.items()}),
+            }
+            for i, result in enumerate(results)
+        ],
+        # Mean over folds for each forecast day
+        'horizon': [
+            {'step': step + 1, **rounded({name: np.nanmean(values[:, step]) for name, values in per_fold.items()})}
+            for step in range(horizon)
+        ],
+    }
+
+
+def run_symbol(symbol, period, config, directory, force):
+    """Worker entry point: load history and backtest one symbol"""
+    from services.datastore import BarStore
+
+    started = time.time()
+    hist_data = BarStore().history(symbol, period=period)
+    if hist_data.empty:
+        return symbol, None, 'No data found for this symbol', time.time() - started
+    summary = backtest_symbol(symbol, hist_data, config, directory, force)
+    return symbol, summary, None, time.time() - started
+
+
+def main(argv=None):
+    from app import DX_STOCKS
+    from services.batch_train import _init_worker
+
+    parser = argparse.ArgumentParser(description='Walk-forward backtests for the DX_STOCKS universe')
+    parser.add_argument('--symbols', nargs='+', default=list(DX_STOCKS),
+                        help='Symbols to backtest (default: every DX_STOCKS symbol)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Symbols backtested in parallel, one process each')
+    parser.add_argument('--intra-op-threads', type=int, default=1,
+                        help='TensorFlow intra-op threads per worker')
+    parser.add_argument('--period', default='max', help='History period to load')
+    parser.add_argument('--folds', type=int, default=DEFAULT_CONFIG['folds'], help='Monthly test blocks')
+    parser.add_argument('--horizon', type=int, default=DEFAULT_CONFIG['horizon'], help='Days forecast per origin')
+    parser.add_argument('--train-size', type=int, default=DEFAULT_CONFIG['train_size'],
+                        help='Training windows before each fold')
+    parser.add_argument('--epochs', type=int, default=DEFAULT_CONFIG['epochs'])
+    parser.add_argument('--output-dir', default=BACKTEST_DIR)
+    parser.add_argument('--force', action='store_true', help='Recompute folds even when unchanged')
+    args = parser.parse_args(argv)
+
+    config = {
+        **DEFAULT_CONFIG,
+        'folds': args.folds,
+        'horizon': args.horizon,
+        'train_size': args.train_size,
+        'epochs': args.epochs,
+    }
+    started = time.time()
+    failed = []
+    # Spawn rather than fork so every worker starts with a clean TensorFlow runtime
+    with ProcessPoolExecutor(
+        max_workers=max(1, args.workers),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(args.intra_op_threads, 1),
+    ) as pool:
+        futures = {
+            pool.submit(run_symbol, symbol.upper(), args.period, config, args.output_dir, args.force): symbol
+            for symbol in args.symbols
+        }
+        for future in as_completed(futures):
+            symbol = futures[future].upper()
+            try:
+                _, summary, error, elapsed = future.result()
+            except Exception as e:
+                summary, error, elapsed = None, str(e), 0.0
+            if summary is None:
+                failed.append(symbol)
+                print(f"[failed] {symbol}: {error}")
+                continue
+            cached = sum(fold['cached'] for fold in summary['folds'])
+            first_day = summary['horizon'][0] if summary['horizon'] else {}
+            print(f"[ok] {symbol} in {elapsed:.1f}s: {len(summary['folds'])} folds ({cached} cached), "
+                  f"1-day MAPE {first_day.get('mape')}, directional {first_day.get('directional_accuracy')}")
+
+    print(f"Backtested {len(args.symbols) - len(failed)}/{len(args.symbols)} symbols in {time.time() - started:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
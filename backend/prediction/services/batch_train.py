@@ -0,0 +1,128 @@
+"""Offline training for the whole DX_STOCKS universe.
+
+Each symbol is trained in its own worker process and saved to the model
+registry, where the API picks the new artifacts up on its next request.
+
+Run from ``backend/prediction``::
+
+    python -m services.batch_train --workers 4 --intra-op-threads 2
+    python -m services.batch_train --symbols BBCA BBRI
+    python -m services.batch_train --incremental
+
+``--incremental`` fine-tunes each saved model on the bars added since it was
+trained and only retrains from scratch when there is no saved model or its
+validation accuracy has drifted (see ``StockPredictor.fine_tune``).
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from services.registry import DEFAULT_MODEL_DIR, FEATURE_VERSION
+
+
+def _init_worker(intra_op_threads, inter_op_threads):
+    """Limit TensorFlow's thread pools before the worker builds any model"""
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+
+
+def train_symbol(symbol, period, model_dir, version, incremental=False, hyperparameters=None):
+    """Load history, train and save the model for one symbol"""
+    from app import StockPredictor
+    from services.datastore import BarStore
+    from services.registry import ModelRegistry
+
+    started = time.time()
+    hist_data = BarStore().history(symbol, period=period)
+    if hist_data.empty:
+        return symbol, False, 'No data found for this symbol', time.time() - started
+
+    registry = ModelRegistry(root=model_dir, version=version)
+    predictor = StockPredictor(registry=registry)
+    try:
+        entry = predictor.train_symbol(symbol, hist_data, incremental=incremental,
+                                       hyperparameters=hyperparameters)
+    except ValueError:
+        return symbol, False, 'Training failed', time.time() - started
+
+    return symbol, True, f"{entry.meta.get('training', 'full')} {entry.accuracy}", time.time() - started
+
+
+def train_all(symbols, workers, intra_op_threads, inter_op_threads, period='5y',
+              model_dir=DEFAULT_MODEL_DIR, version=FEATURE_VERSION, incremental=False):
+    """Train ``symbols`` on a process pool and return ``{symbol: (ok, detail)}``"""
+    results = {}
+    # Spawn rather than fork so every worker starts with a clean TensorFlow runtime
+    context = multiprocessing.get_context('spawn')
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(intra_op_threads, inter_op_threads),
+    ) as pool:
+        futures = {
+            pool.submit(train_symbol, symbol, period, model_dir, version, incremental): symbol
+            for symbol in symbols
+        }
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                _, ok, detail, elapsed = future.result()
+            except Exception as e:
+                ok, detail, elapsed = False, str(e), 0.0
+            results[symbol] = (ok, detail)
+            status = 'ok' if ok else 'failed'
+            print(f"[{status}] {symbol} in {elapsed:.1f}s: {detail}")
+
+    return results
+
+
+def main(argv=None):
+    from app import DX_STOCKS
+
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description='Train LSTM models for the DX_STOCKS universe')
+    parser.add_argument('--symbols', nargs='+', default=list(DX_STOCKS),
+                        help='Symbols to train (default: every DX_STOCKS symbol)')
+    parser.add_argument('--workers', type=int, default=cpu_count,
+                        help='Concurrent training processes (default: CPU count)')
+    parser.add_argument('--intra-op-threads', type=int, default=1,
+                        help='TensorFlow intra-op threads per worker')
+    parser.add_argument('--inter-op-threads', type=int, default=1,
+                        help='TensorFlow inter-op threads per worker')
+    parser.add_argument('--period', default='5y', help='History period to train on')
+    parser.add_argument('--model-dir', default=DEFAULT_MODEL_DIR)
+    parser.add_argument('--version', default=FEATURE_VERSION,
+                        help='Feature-set version the artifacts are written under')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Fine-tune saved models on new bars instead of retraining from scratch')
+    args = parser.parse_args(argv)
+
+    started = time.time()
+    results = train_all(
+        [symbol.upper() for symbol in args.symbols],
+        workers=max(1, args.workers),
+        intra_op_threads=args.intra_op_threads,
+        inter_op_threads=args.inter_op_threads,
+        period=args.period,
+        model_dir=args.model_dir,
+        version=args.version,
+        incremental=args.incremental,
+    )
+
+    failed = sorted(symbol for symbol, (ok, _) in results.items() if not ok)
+    print(f"Trained {len(results) - len(failed)}/{len(results)} symbols in {time.time() - started:.1f}s")
+    if failed:
+        print(f"Failed: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,62 @@
+"""Precompute /stock/<symbol> responses for the DX_STOCKS universe.
+
+Meant to run once a day after the IDX close (16:00 WIB), e.g. from cron in
+the container's timezone::
+
+    30 16 * * * cd /app && python -m services.build_snapshots
+
+Only complete payloads are written. A symbol whose forecast or fundamentals
+fail keeps being served live until the next successful run.
+"""
+import argparse
+import time
+
+def build_snapshots(symbols, snapshot_store=None):
+    """Compute and store a snapshot per symbol; return the symbols that failed"""
+    from app import BACKGROUND_STAGE_TIMEOUTS, build_stock_payload
+
+    if snapshot_store is None:
+        from app import snapshot_store
+
+    failed = []
+    for symbol in symbols:
+        started = time.time()
+        try:
+            payload = build_stock_payload(symbol, timeouts=BACKGROUND_STAGE_TIMEOUTS)
+        except Exception as e:
+            payload, reason = None, str(e)
+        else:
+            if payload is None:
+                reason = 'No data found for this symbol'
+            elif payload['data']['unavailable']:
+                reason = f"incomplete: {payload['data']['unavailable']}"
+                payload = None
+
+        if payload is None:
+            failed.append(symbol)
+            print(f"[failed] {symbol}: {reason}")
+            continue
+
+        snapshot_store.write(symbol, payload)
+        print(f"[ok] {symbol} in {time.time() - started:.1f}s")
+
+    return failed
+
+
+def main(argv=None):
+    from app import DX_STOCKS
+
+    parser = argparse.ArgumentParser(description='Precompute /stock responses for DX_STOCKS')
+    parser.add_argument('--symbols', nargs='+', default=list(DX_STOCKS),
+                        help='Symbols to snapshot (default: every DX_STOCKS symbol)')
+    args = parser.parse_args(argv)
+
+    failed = build_snapshots([symbol.upper() for symbol in args.symbols])
+    if failed:
+        print(f"Failed: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,96 @@
+"""Keyed TTL cache with stale-while-revalidate refreshes.
+
+A value younger than ``ttl`` is served as-is. An older value is still served
+immediately while a background thread reloads it, so callers only wait on the
+loader for keys that have never been loaded. With ``disk_dir`` set, values are
+also written as JSON so they survive restarts.
+"""
+import json
+import os
+import threading
+import time
+
+from services.datastore import atomic_write
+from services.metrics import metrics
+
+
+class TTLCache:
+    def __init__(self, loader, ttl, disk_dir=None, is_valid=bool, name='cache'):
+        self.loader = loader
+        self.name = name
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        # Values rejected by is_valid (e.g. {} after a failed fetch) are returned but never cached
+        self.is_valid = is_valid
+        self._items = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+
+        if item is None and self.disk_dir:
+            item = self._read_disk(key)
+            if item is not None:
+                with self._lock:
+                    self._items[key] = item
+
+        if item is None:
+            metrics.inc('cache_requests_total', cache=self.name, result='miss')
+            return self._load(key)
+
+        value, stored_at = item
+        if time.time() - stored_at > self.ttl:
+            metrics.inc('cache_requests_total', cache=self.name, result='stale')
+            self._refresh_in_background(key)
+        else:
+            metrics.inc('cache_requests_total', cache=self.name, result='hit')
+        return value
+
+    def _load(self, key):
+        value = self.loader(key)
+        if self.is_valid(value):
+            item = (value, time.time())
+            with self._lock:
+                self._items[key] = item
+            if self.disk_dir:
+                self._write_disk(key, item)
+        return value
+
+    def _refresh_in_background(self, key):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._load(key)
+            except Exception as e:
+                print(f"Error refreshing cached {key}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key):
+        try:
+            with open(self._path(key)) as f:
+                stored = json.load(f)
+            return stored['value'], stored['stored_at']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, key, item):
+        value, stored_at = item
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            content = {'value': value, 'stored_at': stored_at}
+            atomic_write(self._path(key), lambda f: json.dump(content, f), mode='w')
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error persisting cached {key}: {str(e)}")
@@ -0,0 +1,200 @@
+"""Local store of daily OHLCV bars.
+
+Bars are kept per symbol in a Parquet file under ``DATA_DIR`` and read back
+memory-mapped. Each symbol is checked against its data source at most once
+per day, and only the tail since the last stored bar is downloaded.
+
+Sources are pluggable: ``YahooDataSource`` is used in production and
+``CsvDataSource`` serves bars from local files for tests and offline runs.
+"""
+import os
+import tempfile
+import threading
+from datetime import date, datetime
+
+DEFAULT_DATA_DIR = os.environ.get(
+    'DATA_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+)
+DEFAULT_BACKFILL = '5y'
+
+
+def atomic_write(path, write, mode='wb'):
+    """Write ``path`` through a temporary file of its own and rename it into place
+
+    ``write`` gets the open file. Every call stages in a unique file next to
+    ``path``, so concurrent writers (gunicorn workers, the nightly jobs)
+    never interleave and readers only ever see a complete file.
+    """
+    fd, staging = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp',
+                                   dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.replace(staging, path)
+    except BaseException:
+        try:
+            os.remove(staging)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def period_offset(period):
+    """Translate a yfinance-style period ('5y', '6mo', '30d') into a DateOffset"""
+    import pandas as pd
+
+    if period == 'max':
+        return None
+    if period.endswith('mo'):
+        return pd.DateOffset(months=int(period[:-2]))
+    if period.endswith('y'):
+        return pd.DateOffset(years=int(period[:-1]))
+    if period.endswith('d'):
+        return pd.DateOffset(days=int(period[:-1]))
+    raise ValueError(f"Unsupported period: {period}")
+
+
+def longer_period(first, second):
+    """Return whichever of two periods reaches further back"""
+    import pandas as pd
+
+    first_offset, second_offset = period_offset(first), period_offset(second)
+    if first_offset is None or second_offset is None:
+        return 'max'
+    anchor = pd.Timestamp('2000-01-01')
+    return first if anchor - first_offset <= anchor - second_offset else second
+
+
+def slice_period(df, period):
+    """Keep the bars within ``period`` of the latest bar"""
+    offset = period_offset(period)
+    if offset is None or df.empty:
+        return df
+    return df[df.index >= df.index[-1].normalize() - offset]
+
+
+class DataSource:
+    """Interface for anything that can supply daily bars for a symbol"""
+
+    def history(self, symbol, period=None, start=None):
+        """Return bars for ``symbol`` over ``period`` or from ``start`` onward"""
+        raise NotImplementedError
+
+
+class YahooDataSource(DataSource):
+    def history(self, symbol, period=None, start=None):
+        import yfinance as yf
+
+        ticker = yf.Ticker(f"{symbol}.JK")
+        if start is not None:
+            return ticker.history(start=start.strftime('%Y-%m-%d'))
+        return ticker.history(period=period or DEFAULT_BACKFILL)
+
+
+class CsvDataSource(DataSource):
+    """Serves bars from ``<directory>/<SYMBOL>.csv`` with a Date index column"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def history(self, symbol, period=None, start=None):
+        import pandas as pd
+
+        path = os.path.join(self.directory, f"{symbol.upper()}.csv")
+        if not os.path.exists(path):
+            return pd.DataFrame()
+
+        df = pd.read_csv(path, index_col=0, parse_dates=True).sort_index()
+        if start is not None:
+            return df[df.index >= start]
+        return slice_period(df, period or DEFAULT_BACKFILL)
+
+
+class BarStore:
+    def __init__(self, root=DEFAULT_DATA_DIR, source=None):
+        self.root = root
+        self.source = source or YahooDataSource()
+        self._locks = {}
+        self._backfilled = {}
+        self._locks_guard = threading.Lock()
+
+    def path(self, symbol):
+        return os.path.join(self.root, f"{symbol.upper()}.parquet")
+
+    def history(self, symbol, period=DEFAULT_BACKFILL):
+        """Return cached bars for ``symbol`` over ``period``, refreshing the tail first"""
+        symbol = symbol.upper()
+        with self._lock_for(symbol):
+            df = self._read(symbol)
+            if df is None or self._needs_backfill(symbol, df, period):
+                df = self._backfill(symbol, period)
+            elif self._is_stale(symbol):
+                df = self._refresh(symbol, df)
+        return slice_period(df, period)
+
+    def _lock_for(self, symbol):
+        with self._locks_guard:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def _read(self, symbol):
+        import pandas as pd
+
+        path = self.path(symbol)
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path, memory_map=True)
+
+    def _write(self, symbol, df):
+        os.makedirs(self.root, exist_ok=True)
+        atomic_write(self.path(symbol), df.to_parquet)
+
+    def _is_stale(self, symbol):
+        """True when the symbol has not been checked against the source today"""
+        checked = datetime.fromtimestamp(os.path.getmtime(self.path(symbol))).date()
+        return checked < date.today()
+
+    def _needs_backfill(self, symbol, df, period):
+        import pandas as pd
+
+        if df.empty:
+            return True
+        fetched = self._backfilled.get(symbol)
+        if fetched is not None and longer_period(fetched, period) == fetched:
+            # Already asked the source for at least this much; it has nothing older
+            return False
+
+        offset = period_offset(period)
+        if offset is None:
+            return True
+        # Allow a week of slack for holidays at the start of the requested range
+        wanted_start = df.index[-1].normalize() - offset
+        return df.index[0] > wanted_start + pd.Timedelta(days=7)
+
+    def _backfill(self, symbol, period):
+        # Never store less than the default so shorter requests share one file
+        period = longer_period(period, DEFAULT_BACKFILL)
+        df = self.source.history(symbol, period=period)
+        self._backfilled[symbol] = period
+        if not df.empty:
+            self._write(symbol, df)
+        return df
+
+    def _refresh(self, symbol, df):
+        import pandas as pd
+
+        # Re-fetch the last stored bar too, in case it was captured mid-session
+        fresh = self.source.history(symbol, start=df.index[-1])
+        if fresh.empty:
+            os.utime(self.path(symbol))
+            return df
+
+        # Dividends and splits rewrite adjusted prices for the whole history
+        corporate_actions = [col for col in ('Dividends', 'Stock Splits') if col in fresh.columns]
+        if corporate_actions and (fresh[corporate_actions].iloc[1:] != 0).any().any():
+            stored_years = (df.index[-1] - df.index[0]).days // 365 + 1
+            return self._backfill(symbol, f"{stored_years}y")
+
+        df = pd.concat([df[df.index < fresh.index[0]], fresh])
+        self._write(symbol, df)
+        return df
@@ -0,0 +1,131 @@
+"""Export Keras models to the NumPy runtime format and check the results.
+
+New registry saves already write ``model.npz``. Use this for artifacts
+saved before that, and for standalone ``.h5`` files (which get a ``.npz``
+next to them). Run from ``backend/prediction``::
+
+    python -m services.export_runtime --verify
+    python -m services.export_runtime --symbols BBCA.JK TLKM.JK --global
+    python -m services.export_runtime --h5 services/lstm_model_BBCA.JK.h5 --verify
+
+``--verify`` runs the Keras model and the exported one on random windows
+and compares single predictions and full rollouts. The command exits with
+status 1 when any difference is larger than ``--tolerance``.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from services.datastore import atomic_write
+from services.global_model import GLOBAL_KEY
+from services.registry import DEFAULT_MODEL_DIR, FEATURE_VERSION, MODEL_FILE, RUNTIME_FILE
+from services.runtime import NumpyForecaster, export_model, load_exported
+
+
+def load_keras(path):
+    from tensorflow.keras.layers import LSTM
+    from tensorflow.keras.models import load_model
+
+    from services.layers import SymbolEmbedding
+
+    class LegacyLSTM(LSTM):
+        # Files saved by older Keras (e.g. services/lstm_model_*.h5) carry an argument Keras 3 rejects
+        def __init__(self, *args, time_major=False, **kwargs):
+            super().__init__(*args, **kwargs)
+
+    return load_model(path, compile=False,
+                      custom_objects={'SymbolEmbedding': SymbolEmbedding, 'LSTM': LegacyLSTM})
+
+
+def export_file(model, path):
+    """Write ``path`` atomically so a serving process never loads a partial file"""
+    atomic_write(path, lambda f: export_model(model, f))
+
+
+def random_windows(model, samples, seed=0):
+    """Scaled-looking input windows; the global model's id column gets valid symbol ids"""
+    rng = np.random.default_rng(seed)
+    _, lookback, n_features = model.input_shape
+    windows = rng.normal(0, 1, (samples, lookback, n_features)).astype(np.float32)
+    for layer in model.layers:
+        if type(layer).__name__ == 'SymbolEmbedding':
+            windows[:, :, -1] = rng.integers(0, layer.n_symbols, samples)[:, np.newaxis]
+    return windows
+
+
+def verify(model, runtime_model, samples, days):
+    """Largest absolute difference of single predictions and of ``days``-step rollouts"""
+    from services.forecasting import Forecaster
+
+    windows = random_windows(model, samples)
+    _, lookback, n_features = model.input_shape
+    single = np.abs(model(windows, training=False).numpy() - runtime_model(windows)).max()
+    rollout = np.abs(
+        Forecaster(model, lookback, n_features).forecast(windows, days)
+        - NumpyForecaster(runtime_model, lookback, n_features).forecast(windows, days)
+    ).max()
+    return float(single), float(rollout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export Keras models for SERVING_RUNTIME=numpy')
+    parser.add_argument('--symbols', nargs='+',
+                        help='Registry symbols to export (default: every trained symbol)')
+    parser.add_argument('--global', dest='include_global', action='store_true',
+                        help='Also export the shared model when --symbols is given')
+    parser.add_argument('--h5', nargs='+', default=[],
+                        help='Standalone .h5 files to export instead of registry artifacts')
+    parser.add_argument('--model-dir', default=DEFAULT_MODEL_DIR)
+    parser.add_argument('--version', default=FEATURE_VERSION)
+    parser.add_argument('--verify', action='store_true',
+                        help='Compare Keras and NumPy outputs after exporting')
+    parser.add_argument('--tolerance', type=float, default=1e-4,
+                        help='Largest allowed absolute difference in scaled units')
+    parser.add_argument('--samples', type=int, default=16, help='Random windows per verification')
+    parser.add_argument('--days', type=int, default=30, help='Rollout length per verification')
+    args = parser.parse_args(argv)
+
+    targets = []
+    if args.h5:
+        targets = [(path, os.path.splitext(path)[0] + '.npz') for path in args.h5]
+    else:
+        root = os.path.join(args.model_dir, args.version)
+        if args.symbols:
+            symbols = [symbol.upper() for symbol in args.symbols]
+            if args.include_global:
+                symbols.append(GLOBAL_KEY)
+        elif os.path.isdir(root):
+            # Staging directories of in-flight saves start with a dot
+            symbols = sorted(name for name in os.listdir(root) if not name.startswith('.'))
+        else:
+            symbols = []
+        targets = [(os.path.join(root, symbol, MODEL_FILE), os.path.join(root, symbol, RUNTIME_FILE))
+                   for symbol in symbols]
+
+    failed = 0
+    for source, target in targets:
+        try:
+            model = load_keras(source)
+            export_file(model, target)
+        except Exception as e:
+            print(f"Error exporting {source}: {str(e)}")
+            failed += 1
+            continue
+
+        if not args.verify:
+            print(f"Exported {target}")
+            continue
+
+        single, rollout = verify(model, load_exported(target), args.samples, args.days)
+        ok = max(single, rollout) <= args.tolerance
+        failed += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {target}: max diff {single:.2e} single, {rollout:.2e} over {args.days} days")
+
+    print(f"{len(targets) - failed}/{len(targets)} models exported" + (" and verified" if args.verify else ""))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Multi-step forecasting for the LSTM models.
+
+The autoregressive rollout (predict the next scaled close, append it to the
+window with the other features carried forward from the last step, repeat)
+runs as a single compiled ``tf.function`` call instead of one
+``model.predict`` per future day. The rollout is batched, so several windows
+(e.g. many symbols or dropout samples) share the same forward passes.
+
+``sample`` runs the same rollout with dropout active (Monte Carlo dropout):
+each window is repeated ``samples`` times and all copies go through every
+step as one batch, so N sampled paths cost one batched rollout.
+"""
+import numpy as np
+import tensorflow as tf
+
+
+class Forecaster:
+    def __init__(self, model, lookback_period, n_features):
+        self.model = model
+        self.lookback_period = lookback_period
+        self.n_features = n_features
+        self._rollout = self._compile(training=False)
+        # Traced on the first sample() call
+        self._sampled_rollout = None
+
+    def _compile(self, training):
+        # days is a tensor, so any horizon reuses the same traced graph
+        return tf.function(
+            lambda windows, days: self._rollout_steps(windows, days, training),
+            input_signature=[
+                tf.TensorSpec((None, self.lookback_period, self.n_features), tf.float32),
+                tf.TensorSpec((), tf.int32),
+            ],
+        )
+
+    def _rollout_steps(self, windows, days, training=False):
+        predictions = tf.TensorArray(tf.float32, size=days)
+        sequence = windows
+        for step in tf.range(days):
+            pred = self.model(sequence, training=training)
+            # Predicted close followed by the last known values of the other features
+            new_row = tf.concat([pred[:, tf.newaxis, :], sequence[:, -1:, 1:]], axis=-1)
+            sequence = tf.concat([sequence[:, 1:], new_row], axis=1)
+            predictions = predictions.write(step, pred[:, 0])
+        return tf.transpose(predictions.stack())
+
+    def forecast(self, windows, days=30):
+        """Roll ``windows`` forward ``days`` steps and return scaled predictions
+
+        ``windows`` is a single ``(lookback, features)`` window or a batch of
+        them; the result has shape ``(batch, days)``.
+        """
+        windows = np.asarray(windows, dtype=np.float32)
+        if windows.ndim == 2:
+            windows = windows[np.newaxis]
+        return self._rollout(tf.constant(windows), tf.constant(days, dtype=tf.int32)).numpy()
+
+    def sample(self, windows, days=30, samples=100):
+        """``samples`` rollouts of every window with dropout active, shape ``(batch, samples, days)``"""
+        windows = np.asarray(windows, dtype=np.float32)
+        if windows.ndim == 2:
+            windows = windows[np.newaxis]
+        if self._sampled_rollout is None:
+            self._sampled_rollout = self._compile(training=True)
+        tiled = np.repeat(windows, samples, axis=0)
+        paths = self._sampled_rollout(tf.constant(tiled), tf.constant(days, dtype=tf.int32)).numpy()
+        return paths.reshape(len(windows), samples, days)
@@ -0,0 +1,209 @@
+"""Optional single LSTM shared by every symbol.
+
+The per-symbol model needs one network per ticker. The global model is one
+network trained on all of them, with a learned symbol embedding next to the
+nine features. Each symbol keeps its own RobustScaler, so every series is
+scaled on its own price level.
+
+The symbol id travels as an extra last column of each window, and
+``SymbolEmbedding`` swaps it for the embedding inside the model. The
+autoregressive rollout carries non-Close columns forward, so the id stays
+fixed on every step. A forecast for the whole universe is then a single
+``Forecaster`` call with one window per symbol.
+
+``SymbolEmbedding`` itself lives in ``services/layers.py``, so serving the
+exported model with SERVING_RUNTIME=numpy never imports TensorFlow.
+
+Enable it with GLOBAL_MODEL=1 after training, from ``backend/prediction``::
+
+    python -m services.global_model --period 5y
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from services.indicators import FEATURE_COLUMNS
+from services.runtime import forecast_intervals, make_forecaster
+from services.windowing import materialize_windows
+
+GLOBAL_MODEL = os.environ.get('GLOBAL_MODEL', '0') == '1'
+# Registry directory name of the shared model; not a ticker
+GLOBAL_KEY = '_GLOBAL'
+EMBEDDING_DIM = 8
+
+
+def create_global_model(lookback_period, n_features, n_symbols):
+    """The per-symbol LSTM architecture behind a symbol embedding"""
+    from tensorflow.keras import Input
+    from tensorflow.keras.layers import LSTM, Dense, Dropout
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.optimizers import Adam
+
+    from services.layers import SymbolEmbedding
+
+    model = Sequential([
+        Input(shape=(lookback_period, n_features + 1)),
+        SymbolEmbedding(n_symbols),
+        LSTM(units=100, return_sequences=True),
+        Dropout(0.2),
+        LSTM(units=70, return_sequences=False),
+        Dropout(0.1),
+        Dense(units=50),
+        Dense(units=1)
+    ])
+
+    model.compile(optimizer=Adam(learning_rate=0.001), loss='mse')
+    return model
+
+
+def with_symbol_column(windows, symbol_id):
+    """Append a constant symbol-id column to ``(batch, lookback, features)`` windows"""
+    ids = np.full((*windows.shape[:-1], 1), symbol_id, dtype=np.float32)
+    return np.concatenate([materialize_windows(windows), ids], axis=-1)
+
+
+class GlobalModelEntry:
+    """The shared model with each symbol's scaler and validation metrics"""
+
+    def __init__(self, model, scalers, accuracy=None, meta=None, mtime=None):
+        self.symbol = GLOBAL_KEY
+        self.model = model
+        self.scalers = scalers
+        self.accuracy = accuracy or {}
+        self.meta = meta or {}
+        self.mtime = mtime
+        self.symbol_ids = {symbol: i for i, symbol in enumerate(self.meta['symbols'])}
+        self._forecaster = None
+
+    def __contains__(self, symbol):
+        return symbol.upper() in self.symbol_ids
+
+    @property
+    def forecaster(self):
+        if self._forecaster is None:
+            self._forecaster = make_forecaster(
+                self.model, self.meta['lookback_period'], len(self.meta['feature_columns']) + 1
+            )
+        return self._forecaster
+
+    def forecast(self, features, days=30, samples=0):
+        """Forecast closing prices for ``{symbol: feature frame}`` in one batched rollout
+
+        Returns ``{symbol: array of days prices}``. With ``samples`` each
+        array is ``(days, 4)``: the forecast, then the INTERVAL_PERCENTILES
+        of that many Monte Carlo dropout paths.
+        """
+        lookback = self.meta['lookback_period']
+        symbols = [symbol.upper() for symbol in features]
+        windows = []
+        for symbol, frame in zip(symbols, features.values()):
+            scaled = self.scalers[symbol].transform(frame[FEATURE_COLUMNS].iloc[-lookback:])
+            windows.append(with_symbol_column(scaled[np.newaxis], self.symbol_ids[symbol])[0])
+
+        if samples:
+            predictions = forecast_intervals(self.forecaster, np.stack(windows), days, samples)
+        else:
+            predictions = self.forecaster.forecast(np.stack(windows), days)
+        # RobustScaler's inverse for the Close column alone
+        return {
+            symbol: predictions[i] * self.scalers[symbol].scale_[0] + self.scalers[symbol].center_[0]
+            for i, symbol in enumerate(symbols)
+        }
+
+
+def train_global(histories, predictor, epochs=100, batch_size=64, callbacks=None):
+    """Fit one model on ``{symbol: history}``; return (model, scalers, accuracy, symbols)
+
+    ``predictor`` is a StockPredictor used for its feature and window
+    preparation and its accuracy metrics. The last ``validation_split`` of
+    every symbol's windows is held out, so validation stays out-of-time per
+    symbol.
+    """
+    from sklearn.preprocessing import RobustScaler
+    from tensorflow.keras.callbacks import EarlyStopping
+
+    symbols, scalers = [], {}
+    train_X, train_y, val_X, val_y = [], [], [], []
+    for symbol, hist_data in histories.items():
+        scaler = RobustScaler()
+        X, y, _ = predictor.prepare_data(hist_data, scaler=scaler)
+        if X is None:
+            print(f"Skipping {symbol}: not enough data")
+            continue
+
+        symbol_id = len(symbols)
+        symbols.append(symbol)
+        scalers[symbol] = scaler
+        split_idx = int(len(X) * (1 - predictor.validation_split))
+        train_X.append(with_symbol_column(X[:split_idx], symbol_id))
+        val_X.append(with_symbol_column(X[split_idx:], symbol_id))
+        train_y.append(y[:split_idx])
+        val_y.append(y[split_idx:])
+
+    if not symbols:
+        raise ValueError("No symbol had enough data to train on")
+
+    model = create_global_model(predictor.lookback_period, len(FEATURE_COLUMNS), len(symbols))
+    early_stopping = EarlyStopping(monitor='val_loss', patience=15, restore_best_weights=True)
+    model.fit(
+        np.concatenate(train_X), np.concatenate(train_y),
+        validation_data=(np.concatenate(val_X), np.concatenate(val_y)),
+        epochs=epochs,
+        batch_size=batch_size,
+        verbose=1,
+        callbacks=[early_stopping] + list(callbacks or [])
+    )
+
+    accuracy = {}
+    for symbol, X, y in zip(symbols, val_X, val_y):
+        scale, center = scalers[symbol].scale_[0], scalers[symbol].center_[0]
+        y_pred = model.predict(X, verbose=0)[:, 0]
+        accuracy[symbol] = predictor.calculate_accuracy_metrics(y * scale + center, y_pred * scale + center)
+
+    return model, scalers, accuracy, symbols
+
+
+def main(argv=None):
+    from app import DX_STOCKS, StockPredictor
+    from services.datastore import BarStore
+    from services.registry import DEFAULT_MODEL_DIR, FEATURE_VERSION, ModelRegistry
+
+    parser = argparse.ArgumentParser(description='Train one shared LSTM for the DX_STOCKS universe')
+    parser.add_argument('--symbols', nargs='+', default=list(DX_STOCKS),
+                        help='Symbols to train on (default: every DX_STOCKS symbol)')
+    parser.add_argument('--period', default='5y', help='History period to train on')
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--model-dir', default=DEFAULT_MODEL_DIR)
+    parser.add_argument('--version', default=FEATURE_VERSION,
+                        help='Feature-set version the artifacts are written under')
+    args = parser.parse_args(argv)
+
+    started = time.time()
+    store = BarStore()
+    histories = {}
+    for symbol in args.symbols:
+        hist_data = store.history(symbol.upper(), period=args.period)
+        if hist_data.empty:
+            print(f"Skipping {symbol.upper()}: no data")
+            continue
+        histories[symbol.upper()] = hist_data
+
+    predictor = StockPredictor()
+    model, scalers, accuracy, symbols = train_global(histories, predictor, args.epochs, args.batch_size)
+
+    registry = ModelRegistry(root=args.model_dir, version=args.version)
+    registry.save_global(
+        model, scalers, accuracy,
+        symbols=symbols,
+        lookback_period=predictor.lookback_period,
+        feature_columns=FEATURE_COLUMNS,
+    )
+    print(f"Trained the global model on {len(symbols)} symbols in {time.time() - started:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,201 @@
+"""Technical indicators for the LSTM features and the /stock technical metrics.
+
+``compute_features`` derives every feature in one vectorized pass with the
+same definitions as the ``ta`` indicators it replaces: RSI(14), ROC(12), the
+MACD(12, 26, 9) histogram and Bollinger(20, 2) width.
+
+``IndicatorEngine`` caches the feature frame per symbol together with the
+rolling and EMA state at its last bar. When the bar store adds a day, only
+the new rows are computed from that state, and the earlier history is not
+recomputed.
+"""
+import threading
+from collections import deque
+
+import numpy as np
+
+from services.metrics import metrics
+
+FEATURE_COLUMNS = ['Close', 'Returns', 'SMA20', 'SMA50', 'RSI', 'ROC', 'MACD', 'BB_width', 'Volume_Ratio']
+
+RSI_WINDOW = 14
+ROC_WINDOW = 12
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BB_WINDOW, BB_DEV = 20, 2
+VOLUME_WINDOW = 20
+# Longest lookback any feature or technical metric needs (SMA200)
+HISTORY_WINDOW = 200
+# More new bars than this since the cached state is treated as a new history
+MAX_INCREMENTAL_BARS = 5
+
+
+def _alpha(span):
+    return 2 / (span + 1)
+
+
+def compute_features(df):
+    """Return ``df`` with the feature columns added, forward-filled and zero-filled"""
+    features, _ = _compute(df)
+    return features
+
+
+def _compute(df):
+    """Vectorized features for ``df`` plus the indicator state at its last bar"""
+    df = df.copy()
+    close = df['Close']
+
+    df['Returns'] = close.pct_change()
+    df['SMA20'] = close.rolling(window=20).mean()
+    df['SMA50'] = close.rolling(window=50).mean()
+
+    diff = close.diff(1)
+    emaup = diff.where(diff > 0, 0.0).ewm(alpha=1 / RSI_WINDOW, min_periods=RSI_WINDOW, adjust=False).mean()
+    emadn = (-diff.where(diff < 0, 0.0)).ewm(alpha=1 / RSI_WINDOW, min_periods=RSI_WINDOW, adjust=False).mean()
+    df['RSI'] = np.where(emadn == 0, 100, 100 - (100 / (1 + emaup / emadn)))
+
+    shifted = close.shift(ROC_WINDOW)
+    df['ROC'] = (close - shifted) / shifted * 100
+
+    ema_fast = close.ewm(span=MACD_FAST, min_periods=MACD_FAST, adjust=False).mean()
+    ema_slow = close.ewm(span=MACD_SLOW, min_periods=MACD_SLOW, adjust=False).mean()
+    macd = ema_fast - ema_slow
+    signal = macd.ewm(span=MACD_SIGNAL, min_periods=MACD_SIGNAL, adjust=False).mean()
+    df['MACD'] = macd - signal
+
+    std = close.rolling(BB_WINDOW).std(ddof=0)
+    df['BB_width'] = 2 * BB_DEV * std / close
+
+    df['Volume_SMA'] = df['Volume'].rolling(window=VOLUME_WINDOW).mean()
+    df['Volume_Ratio'] = df['Volume'] / df['Volume_SMA']
+
+    features = df.ffill().fillna(0)
+
+    state = None
+    if len(df) >= HISTORY_WINDOW:
+        state = {
+            'closes': deque(close.to_numpy()[-HISTORY_WINDOW:], maxlen=HISTORY_WINDOW),
+            'volumes': deque(df['Volume'].to_numpy()[-VOLUME_WINDOW:], maxlen=VOLUME_WINDOW),
+            'emaup': emaup.iloc[-1],
+            'emadn': emadn.iloc[-1],
+            'ema_fast': ema_fast.iloc[-1],
+            'ema_slow': ema_slow.iloc[-1],
+            'signal': signal.iloc[-1],
+        }
+    return features, state
+
+
+def _advance(state, bar, previous):
+    """Compute the feature row for one new bar and advance ``state`` in place
+
+    ``previous`` is the last (already filled) feature row; missing values in
+    the new row are forward-filled from it, as ``compute_features`` does.
+    """
+    import pandas as pd
+
+    closes, volumes = state['closes'], state['volumes']
+    close, volume = float(bar['Close']), float(bar['Volume'])
+    prev_close = closes[-1]
+
+    diff = close - prev_close
+    a = 1 / RSI_WINDOW
+    state['emaup'] = (1 - a) * state['emaup'] + a * max(diff, 0.0)
+    state['emadn'] = (1 - a) * state['emadn'] + a * max(-diff, 0.0)
+    for key, span in (('ema_fast', MACD_FAST), ('ema_slow', MACD_SLOW)):
+        state[key] = (1 - _alpha(span)) * state[key] + _alpha(span) * close
+    macd = state['ema_fast'] - state['ema_slow']
+    state['signal'] = (1 - _alpha(MACD_SIGNAL)) * state['signal'] + _alpha(MACD_SIGNAL) * macd
+
+    roc_base = closes[-ROC_WINDOW]
+    closes.append(close)
+    volumes.append(volume)
+    recent = np.fromiter(closes, dtype=float)
+    volume_sma = sum(volumes) / len(volumes)
+
+    emadn = state['emadn']
+    row = dict(bar)
+    row.update({
+        'Returns': close / prev_close - 1 if prev_close else np.nan,
+        'SMA20': recent[-20:].mean(),
+        'SMA50': recent[-50:].mean(),
+        'RSI': 100.0 if emadn == 0 else 100 - 100 / (1 + state['emaup'] / emadn),
+        'ROC': (close - roc_base) / roc_base * 100 if roc_base else np.nan,
+        'MACD': macd - state['signal'],
+        'BB_width': 2 * BB_DEV * recent[-BB_WINDOW:].std() / close if close else np.nan,
+        'Volume_SMA': volume_sma,
+        'Volume_Ratio': volume / volume_sma if volume_sma else np.nan,
+    })
+    for key, value in row.items():
+        if pd.isna(value) and key in previous:
+            row[key] = previous[key]
+    return row
+
+
+class IndicatorEngine:
+    def __init__(self):
+        self._cache = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def features(self, symbol, df):
+        """Feature frame for ``df``, computed incrementally from the cached state when possible"""
+        import pandas as pd
+
+        symbol = symbol.upper()
+        with self._lock_for(symbol):
+            frame, state = self._cache.get(symbol, (None, None))
+
+            if not self._extends(frame, state, df):
+                metrics.inc('cache_requests_total', cache='indicators', result='miss')
+                frame, state = _compute(df)
+            elif df.index[-1] > frame.index[-1]:
+                metrics.inc('cache_requests_total', cache='indicators', result='incremental')
+                new_bars = df[df.index > frame.index[-1]]
+                previous = frame.iloc[-1].to_dict()
+                rows = []
+                for _, bar in new_bars.iterrows():
+                    previous = _advance(state, bar.to_dict(), previous)
+                    rows.append(previous)
+                frame = pd.concat([frame, pd.DataFrame(rows, index=new_bars.index)[frame.columns]])
+            else:
+                metrics.inc('cache_requests_total', cache='indicators', result='hit')
+
+            self._cache[symbol] = (frame, state)
+
+        # A history window that slid forward keeps the values computed from the earlier start
+        return frame[frame.index >= df.index[0]]
+
+    def technical_metrics(self, symbol, df):
+        """Moving averages, volume and volatility figures for the route, from the cached state"""
+        frame = self.features(symbol, df)
+        with self._lock_for(symbol.upper()):
+            _, state = self._cache[symbol.upper()]
+
+        latest_price = float(frame['Close'].iloc[-1])
+        # SMA50 is zero-filled until 50 bars exist; report it as missing rather than dividing by zero
+        sma_50 = float(frame['SMA50'].iloc[-1]) or float('nan')
+        sma_200 = float(np.mean(state['closes'])) if state is not None else float('nan')
+
+        return {
+            'sma50': sma_50,
+            'sma200': sma_200,
+            'priceToSMA50': (latest_price / sma_50 - 1) * 100,
+            'priceToSMA200': (latest_price / sma_200 - 1) * 100,
+            'volumeAvg20': int(frame['Volume_SMA'].iloc[-1]),
+            'volatility20': float(frame['Close'].pct_change().std() * np.sqrt(252) * 100)
+        }
+
+    def _lock_for(self, symbol):
+        with self._locks_guard:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def _extends(self, frame, state, df):
+        """True when ``df`` is the cached history plus at most a few new bars"""
+        if frame is None or state is None or df.empty:
+            return False
+        last = frame.index[-1]
+        if df.index[0] < frame.index[0] or last not in df.index:
+            return False
+        if len(df[df.index > last]) > MAX_INCREMENTAL_BARS:
+            return False
+        # The last cached bar may have been captured mid-session and revised since
+        return df.at[last, 'Close'] == frame.at[last, 'Close'] and df.at[last, 'Volume'] == frame.at[last, 'Volume']
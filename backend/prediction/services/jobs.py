@@ -0,0 +1,263 @@
+"""Background training and forecasting jobs.
+
+Jobs run on a bounded thread pool behind a bounded queue. Each job records
+epoch-level progress through a Keras callback, and its result is kept for
+``retention`` seconds after it finishes.
+
+The state of every job (status, progress, result) is a JSON file under
+``JOB_DIR``, so any gunicorn worker, not only the one that accepted a job,
+answers ``/jobs/<id>``. A job only starts once it holds one of
+``max_workers`` lock files there, which caps concurrent ``model.fit`` calls
+across all processes sharing the directory.
+"""
+import fcntl
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+
+from services.datastore import DEFAULT_DATA_DIR, atomic_write
+from services.serialize import dumps, loads
+
+JOB_DIR = os.environ.get('JOB_DIR', os.path.join(DEFAULT_DATA_DIR, 'jobs'))
+# How often waiting jobs look for a free slot and event streams look for changes
+POLL_SECONDS = 0.5
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind, symbol=None, key=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.symbol = symbol
+        # Stored as a list so it compares equal after a JSON round trip
+        self.key = list(key) if key is not None else None
+        self.status = QUEUED
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        # Bumped on every change so event streams can wait for the next update
+        self.version = 0
+        # The process running the job, to notice when it exits without finishing it
+        self.owner = process_id()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    @property
+    def orphaned(self):
+        """True for an unfinished job whose process on this host is gone (e.g. a restarted worker)"""
+        host, _, pid = self.owner.rpartition(':')
+        if self.finished or host != socket.gethostname():
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': self.kind,
+            'symbol': self.symbol,
+            'status': self.status,
+            'progress': self.progress,
+            'error': self.error,
+            'createdAt': self.created_at,
+            'finishedAt': self.finished_at,
+        }
+
+    def to_record(self):
+        """Everything needed to rebuild the job in another process"""
+        return {**self.to_dict(), 'key': self.key, 'result': self.result, 'version': self.version,
+                'owner': self.owner}
+
+    @classmethod
+    def from_record(cls, record):
+        job = cls(record['type'], record['symbol'], record['key'])
+        job.id = record['id']
+        job.status = record['status']
+        job.progress = record['progress']
+        job.result = record['result']
+        job.error = record['error']
+        job.created_at = record['createdAt']
+        job.finished_at = record['finishedAt']
+        job.version = record['version']
+        job.owner = record['owner']
+        if job.orphaned:
+            job.status, job.error = FAILED, 'The worker running this job exited'
+            job.finished_at = time.time()
+        return job
+
+
+def process_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+@lru_cache(maxsize=None)
+def job_progress_class():
+    """The Keras callback class, defined on first use so importing jobs does not import TensorFlow"""
+    from tensorflow.keras.callbacks import Callback
+
+    class JobProgress(Callback):
+        """Keras callback that publishes epoch progress to a job"""
+
+        def __init__(self, manager, job):
+            super().__init__()
+            self.manager = manager
+            self.job = job
+
+        def on_epoch_end(self, epoch, logs=None):
+            logs = logs or {}
+            self.manager.update(self.job, progress={
+                'epoch': epoch + 1,
+                'epochs': self.params.get('epochs'),
+                'loss': float(logs['loss']) if 'loss' in logs else None,
+                'val_loss': float(logs['val_loss']) if 'val_loss' in logs else None,
+            })
+
+    return JobProgress
+
+
+class JobManager:
+    def __init__(self, root=JOB_DIR, max_workers=1, max_queued=16, retention=60 * 60):
+        self.root = root
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.retention = retention
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._changed = threading.Condition()
+
+    def path(self, job_id):
+        return os.path.join(self.root, f"{job_id}.json")
+
+    def submit(self, kind, fn, symbol=None, key=None):
+        """Queue ``fn(job)`` and return the Job; its return value becomes the job result
+
+        An unfinished job with the same ``key`` (in any process) is returned
+        instead of queueing a duplicate. Raises JobQueueFull when
+        ``max_queued`` jobs are waiting.
+        """
+        with self._submit_lock():
+            jobs = self._prune()
+            if key is not None:
+                for job in jobs:
+                    if job.key == list(key) and not job.finished:
+                        return job
+            if sum(job.status == QUEUED for job in jobs) >= self.max_queued:
+                raise JobQueueFull(f"{self.max_queued} jobs already queued")
+
+            job = Job(kind, symbol, key)
+            self._save(job)
+
+        self._pool.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id):
+        """The current state of ``job_id`` as written by whichever process runs it, or None"""
+        # Ids come from URLs; anything but a uuid hex never names a job file
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self.path(job_id), 'rb') as f:
+                return Job.from_record(loads(f.read()))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def update(self, job, **changes):
+        with self._changed:
+            for name, value in changes.items():
+                setattr(job, name, value)
+            job.version += 1
+            self._save(job)
+            self._changed.notify_all()
+
+    def wait(self, job_id, version, timeout=15):
+        """The job once it has changed past ``version``, or as it is after ``timeout``"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job.version > version or remaining <= 0:
+                return job
+            # Woken early by updates from this process; others are seen on the next poll
+            with self._changed:
+                self._changed.wait(min(POLL_SECONDS, remaining))
+
+    def callback(self, job):
+        return job_progress_class()(self, job)
+
+    def _run(self, job, fn):
+        with self._slot():
+            self.update(job, status=RUNNING)
+            try:
+                result = fn(job)
+            except Exception as e:
+                self.update(job, status=FAILED, error=str(e), finished_at=time.time())
+            else:
+                self.update(job, status=DONE, result=result, finished_at=time.time())
+
+    @contextmanager
+    def _slot(self):
+        """Hold one of ``max_workers`` job slots shared by every process using ``root``"""
+        os.makedirs(self.root, exist_ok=True)
+        while True:
+            for index in range(self.max_workers):
+                lock_file = open(os.path.join(self.root, f".slot-{index}.lock"), 'a')
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    lock_file.close()
+                    continue
+                try:
+                    yield
+                finally:
+                    lock_file.close()
+                return
+            time.sleep(POLL_SECONDS)
+
+    @contextmanager
+    def _submit_lock(self):
+        """Serializes submissions across processes so duplicate checks and the queue limit hold"""
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, '.submit.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _save(self, job):
+        os.makedirs(self.root, exist_ok=True)
+        atomic_write(self.path(job.id), lambda f: f.write(dumps(job.to_record())))
+
+    def _prune(self):
+        """Delete finished jobs past ``retention`` and return the others"""
+        cutoff = time.time() - self.retention
+        jobs = []
+        for name in os.listdir(self.root):
+            if name.startswith('.') or not name.endswith('.json'):
+                continue
+            job = self.get(name[:-len('.json')])
+            if job is None:
+                continue
+            if job.finished and job.finished_at < cutoff:
+                try:
+                    os.remove(self.path(job.id))
+                except FileNotFoundError:
+                    pass
+                continue
+            jobs.append(job)
+        return jobs
@@ -0,0 +1,39 @@
+"""Custom Keras layers saved inside model files.
+
+Kept apart from ``services/global_model.py`` so that importing the global
+model's serving code does not import TensorFlow; only training and the
+Keras loading path import this module.
+"""
+import tensorflow as tf
+from tensorflow.keras.layers import Layer
+from tensorflow.keras.saving import register_keras_serializable
+
+from services.global_model import EMBEDDING_DIM
+
+
+@register_keras_serializable(package='bursalens')
+class SymbolEmbedding(Layer):
+    """Replace the trailing symbol-id column of each window with a learned embedding"""
+
+    def __init__(self, n_symbols, dim=EMBEDDING_DIM, **kwargs):
+        super().__init__(**kwargs)
+        self.n_symbols = n_symbols
+        self.dim = dim
+
+    def build(self, input_shape):
+        self.embeddings = self.add_weight(
+            name='embeddings', shape=(self.n_symbols, self.dim), initializer='uniform'
+        )
+
+    def call(self, inputs):
+        ids = tf.cast(tf.round(inputs[:, -1, -1]), tf.int32)
+        embedded = tf.gather(self.embeddings, ids)
+        steps = tf.shape(inputs)[1]
+        repeated = tf.tile(embedded[:, tf.newaxis, :], tf.stack([1, steps, 1]))
+        return tf.concat([inputs[..., :-1], repeated], axis=-1)
+
+    def compute_output_shape(self, input_shape):
+        return (*input_shape[:-1], input_shape[-1] - 1 + self.dim)
+
+    def get_config(self):
+        return {**super().get_config(), 'n_symbols': self.n_symbols, 'dim': self.dim}
@@ -0,0 +1,299 @@
+"""Per-symbol model registry.
+
+Trained models are stored under ``<root>/<version>/<SYMBOL>/`` as a Keras
+``model.h5`` next to ``scaler.json`` (the fitted RobustScaler parameters) and
+``meta.json`` (accuracy metrics and training metadata, including the
+lookback and other hyperparameters). ``version`` identifies the feature set
+the model was trained on, so a change to the features never serves a model
+trained on the old layout.
+
+The optional shared model (see ``services/global_model.py``) lives in the
+same layout under ``_GLOBAL/``, with ``scalers.json`` holding one scaler per
+symbol.
+
+Every save also exports ``model.npz`` for the NumPy runtime (see
+``services/runtime.py``). With SERVING_RUNTIME=numpy the registry loads that
+file instead of the Keras model, and falls back to ``model.h5`` for
+artifacts written before the export existed.
+
+Each save writes a new hidden ``.<SYMBOL>-*`` directory next to the others
+and ``<SYMBOL>`` is a symlink that one rename points at it, so the path
+always holds a complete model, even in the middle of a save. The version
+before it is kept for loads that are still reading it.
+
+Loaded models are kept in a small in-memory LRU; warm requests are served
+without touching the disk or retraining.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+from services.global_model import GLOBAL_KEY, GlobalModelEntry
+from services.metrics import metrics
+from services.runtime import SERVING_RUNTIME, export_model, load_exported, make_forecaster
+
+# Bump whenever the feature columns or their order change
+FEATURE_VERSION = 'v1'
+
+DEFAULT_MODEL_DIR = os.environ.get(
+    'MODEL_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+)
+DEFAULT_CACHE_SIZE = int(os.environ.get('MODEL_CACHE_SIZE', 8))
+# Superseded artifact directories younger than this are left alone: another process may still be saving into them
+STALE_VERSION_SECONDS = 600
+
+MODEL_FILE = 'model.h5'
+# The same weights for the NumPy runtime
+RUNTIME_FILE = 'model.npz'
+SCALER_FILE = 'scaler.json'
+# The global model stores one scaler per symbol instead
+SCALERS_FILE = 'scalers.json'
+META_FILE = 'meta.json'
+
+
+def scaler_to_dict(scaler):
+    """Serialize the fitted parameters of a RobustScaler"""
+    params = {
+        'center': scaler.center_.tolist(),
+        'scale': scaler.scale_.tolist(),
+        'n_features_in': int(scaler.n_features_in_),
+    }
+    if hasattr(scaler, 'feature_names_in_'):
+        params['feature_names_in'] = [str(name) for name in scaler.feature_names_in_]
+    return params
+
+
+def scaler_from_dict(params):
+    """Rebuild a fitted RobustScaler from ``scaler_to_dict`` output"""
+    from sklearn.preprocessing import RobustScaler
+
+    scaler = RobustScaler()
+    scaler.center_ = np.array(params['center'])
+    scaler.scale_ = np.array(params['scale'])
+    scaler.n_features_in_ = params['n_features_in']
+    if 'feature_names_in' in params:
+        scaler.feature_names_in_ = np.array(params['feature_names_in'], dtype=object)
+    return scaler
+
+
+class ModelEntry:
+    """A loaded model together with the scaler and metrics it was trained with"""
+
+    def __init__(self, symbol, model, scaler, accuracy=None, meta=None, mtime=None):
+        self.symbol = symbol
+        self.model = model
+        self.scaler = scaler
+        self.accuracy = accuracy
+        self.meta = meta or {}
+        self.mtime = mtime
+        self._forecaster = None
+
+    @property
+    def forecaster(self):
+        """Compiled rollout for this model, built once per loaded entry"""
+        if self._forecaster is None:
+            self._forecaster = make_forecaster(
+                self.model, self.meta['lookback_period'], len(self.meta['feature_columns'])
+            )
+        return self._forecaster
+
+
+class ModelRegistry:
+    def __init__(self, root=DEFAULT_MODEL_DIR, version=FEATURE_VERSION, max_models=DEFAULT_CACHE_SIZE,
+                 runtime=SERVING_RUNTIME):
+        self.root = root
+        self.version = version
+        self.max_models = max_models
+        self.runtime = runtime
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path(self, symbol):
+        """Directory holding the artifacts for ``symbol``"""
+        return os.path.join(self.root, self.version, symbol.upper())
+
+    def exists(self, symbol):
+        return os.path.exists(os.path.join(self.path(symbol), META_FILE))
+
+    def get(self, symbol):
+        """Return the ModelEntry for ``symbol`` or None if nothing was trained yet
+
+        Entries are served from memory while their artifacts on disk are
+        unchanged; a newer ``meta.json`` (e.g. after a nightly retrain) is
+        picked up on the next call.
+        """
+        symbol = symbol.upper()
+        meta_path = os.path.join(self.path(symbol), META_FILE)
+        try:
+            mtime = os.stat(meta_path).st_mtime
+        except FileNotFoundError:
+            self.evict(symbol)
+            metrics.inc('cache_requests_total', cache='models', result='miss')
+            return None
+
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is not None and entry.mtime == mtime:
+                self._entries.move_to_end(symbol)
+                metrics.inc('cache_requests_total', cache='models', result='hit')
+                return entry
+
+        metrics.inc('cache_requests_total', cache='models', result='load')
+        entry = self._load(symbol, mtime)
+        if entry is not None:
+            self._remember(entry)
+        return entry
+
+    def read_meta(self, symbol):
+        """The saved ``meta.json`` of ``symbol`` without loading its model, or None"""
+        try:
+            with open(os.path.join(self.path(symbol), META_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, symbol, model, scaler, accuracy=None, **meta):
+        """Persist a trained model and make it the current entry for ``symbol``"""
+        symbol = symbol.upper()
+        meta = self._meta(symbol, accuracy, meta)
+        mtime = self._write(symbol, model, {SCALER_FILE: scaler_to_dict(scaler), META_FILE: meta})
+        entry = ModelEntry(symbol, model, scaler, accuracy, meta, mtime)
+        self._remember(entry)
+        return entry
+
+    def get_global(self):
+        """The shared multi-symbol model, or None if it was never trained"""
+        return self.get(GLOBAL_KEY)
+
+    def save_global(self, model, scalers, accuracy=None, **meta):
+        """Persist the shared model with ``scalers`` and ``accuracy`` keyed by symbol"""
+        meta = self._meta(GLOBAL_KEY, accuracy, meta)
+        scaler_params = {symbol: scaler_to_dict(scaler) for symbol, scaler in scalers.items()}
+        mtime = self._write(GLOBAL_KEY, model, {SCALERS_FILE: scaler_params, META_FILE: meta})
+        entry = GlobalModelEntry(model, scalers, accuracy, meta, mtime)
+        self._remember(entry)
+        return entry
+
+    def _meta(self, symbol, accuracy, meta):
+        meta = dict(meta)
+        meta.update({
+            'symbol': symbol,
+            'version': self.version,
+            'accuracy': accuracy,
+            'trained_at': datetime.utcnow().isoformat(timespec='seconds'),
+        })
+        return meta
+
+    def _write(self, symbol, model, files):
+        """Atomically replace the artifacts of ``symbol``; return the new meta.json mtime"""
+        target = self.path(symbol)
+        parent = os.path.dirname(target)
+        os.makedirs(parent, exist_ok=True)
+
+        # Write into a new directory first so readers never see a
+        # half-written model, then repoint the symlink at it in one rename
+        staging = tempfile.mkdtemp(prefix=f".{symbol}-", dir=parent)
+        previous = os.path.realpath(target) if os.path.islink(target) else None
+        try:
+            model.save(os.path.join(staging, MODEL_FILE))
+            export_model(model, os.path.join(staging, RUNTIME_FILE))
+            for name, content in files.items():
+                with open(os.path.join(staging, name), 'w') as f:
+                    json.dump(content, f, default=str)
+
+            link = f"{staging}.link"
+            os.symlink(os.path.basename(staging), link)
+            if os.path.isdir(target) and not os.path.islink(target):
+                # Artifacts saved before the symlink layout are a plain directory: move it aside once
+                legacy = tempfile.mkdtemp(prefix=f".{symbol}-", dir=parent)
+                os.rmdir(legacy)
+                os.rename(target, legacy)
+                previous = os.path.realpath(legacy)
+            os.replace(link, target)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            if os.path.islink(f"{staging}.link"):
+                os.remove(f"{staging}.link")
+            raise
+
+        self._prune(symbol, keep={os.path.realpath(staging), previous})
+        return os.stat(os.path.join(target, META_FILE)).st_mtime
+
+    def _prune(self, symbol, keep):
+        """Remove superseded artifact directories of ``symbol`` except ``keep``"""
+        parent = os.path.dirname(self.path(symbol))
+        for name in os.listdir(parent):
+            path = os.path.join(parent, name)
+            if not name.startswith(f".{symbol}-") or os.path.islink(path) or not os.path.isdir(path):
+                continue
+            if os.path.realpath(path) in keep:
+                continue
+            try:
+                if time.time() - os.path.getmtime(path) > STALE_VERSION_SECONDS:
+                    shutil.rmtree(path, ignore_errors=True)
+            except FileNotFoundError:
+                continue
+
+    def evict(self, symbol):
+        with self._lock:
+            self._entries.pop(symbol.upper(), None)
+
+    def _remember(self, entry):
+        with self._lock:
+            self._entries[entry.symbol] = entry
+            self._entries.move_to_end(entry.symbol)
+            while len(self._entries) > self.max_models:
+                self._entries.popitem(last=False)
+
+    def _load(self, symbol, mtime):
+        # Resolve the symlink once so every file comes from the same save
+        directory = os.path.realpath(self.path(symbol))
+        try:
+            with open(os.path.join(directory, META_FILE)) as f:
+                meta = json.load(f)
+            if symbol == GLOBAL_KEY:
+                with open(os.path.join(directory, SCALERS_FILE)) as f:
+                    scalers = {name: scaler_from_dict(params) for name, params in json.load(f).items()}
+            else:
+                with open(os.path.join(directory, SCALER_FILE)) as f:
+                    scaler = scaler_from_dict(json.load(f))
+            model = self._load_model(directory)
+        except Exception as e:
+            print(f"Error loading model for {symbol}: {str(e)}")
+            return None
+
+        if symbol == GLOBAL_KEY:
+            return GlobalModelEntry(model, scalers, meta.get('accuracy'), meta, mtime)
+        return ModelEntry(symbol, model, scaler, meta.get('accuracy'), meta, mtime)
+
+    def load_keras(self, symbol):
+        """A fresh Keras copy of the saved model for ``symbol``, e.g. to continue training it"""
+        try:
+            return self._load_keras(os.path.realpath(self.path(symbol)))
+        except Exception as e:
+            print(f"Error loading Keras model for {symbol}: {str(e)}")
+            return None
+
+    def _load_model(self, directory):
+        runtime_path = os.path.join(directory, RUNTIME_FILE)
+        if self.runtime == 'numpy':
+            if os.path.exists(runtime_path):
+                return load_exported(runtime_path)
+            print(f"No {RUNTIME_FILE} in {directory}, loading the Keras model instead")
+        return self._load_keras(directory)
+
+    def _load_keras(self, directory):
+        from tensorflow.keras.models import load_model
+
+        from services.layers import SymbolEmbedding
+
+        return load_model(os.path.join(directory, MODEL_FILE), compile=False,
+                          custom_objects={'SymbolEmbedding': SymbolEmbedding})
@@ -0,0 +1,182 @@
+"""Pure-NumPy inference for the exported LSTM models.
+
+Serving only needs forward passes of a small stack of LSTM, Dropout, Dense
+(and, for the shared model, SymbolEmbedding) layers. ``export_model`` stores
+a Keras model's layer configs and weights in one ``.npz`` file, and
+``NumpyModel`` replays them with NumPy. With SERVING_RUNTIME=numpy the API
+loads those files and never imports TensorFlow on the serving path.
+Training still uses Keras.
+
+Dropout is the identity for forecasts; ``NumpyForecaster.sample`` applies
+it as in Keras training mode for Monte Carlo dropout intervals.
+"""
+import json
+import os
+
+import numpy as np
+
+SERVING_RUNTIME = os.environ.get('SERVING_RUNTIME', 'keras')
+
+SUPPORTED_LAYERS = {'InputLayer', 'LSTM', 'Dropout', 'Dense', 'SymbolEmbedding'}
+
+# Percentiles of the Monte Carlo dropout paths returned next to the point forecast
+INTERVAL_PERCENTILES = (10, 50, 90)
+
+_ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': lambda x: 1 / (1 + np.exp(-x)),
+}
+
+
+def export_model(model, path):
+    """Write a Keras model's layer specs and weights to ``path`` (.npz)"""
+    specs, arrays = [], {}
+    for index, layer in enumerate(model.layers):
+        # Subclasses (e.g. a loading shim around LSTM) export as the layer they extend
+        kind = next((cls.__name__ for cls in type(layer).__mro__ if cls.__name__ in SUPPORTED_LAYERS), None)
+        if kind is None:
+            raise ValueError(f"Layer {layer.name} ({type(layer).__name__}) has no NumPy implementation")
+        config = layer.get_config()
+        spec = {'type': kind}
+        if kind == 'LSTM':
+            spec.update(
+                units=config['units'],
+                return_sequences=config['return_sequences'],
+                activation=config['activation'],
+                recurrent_activation=config['recurrent_activation'],
+            )
+        elif kind == 'Dense':
+            spec.update(activation=config['activation'])
+        elif kind == 'Dropout':
+            spec.update(rate=config['rate'])
+
+        weights = layer.get_weights()
+        spec['weights'] = len(weights)
+        for i, weight in enumerate(weights):
+            arrays[f"layer{index}_w{i}"] = np.asarray(weight, dtype=np.float32)
+        specs.append(spec)
+
+    arrays['spec'] = np.array(json.dumps({'layers': specs, 'input_shape': list(model.input_shape[1:])}))
+    np.savez(path, **arrays)
+
+
+def load_exported(path):
+    with np.load(path) as data:
+        spec = json.loads(str(data['spec']))
+        layers = []
+        for index, layer in enumerate(spec['layers']):
+            layers.append((layer, [data[f"layer{index}_w{i}"] for i in range(layer['weights'])]))
+    return NumpyModel(layers, tuple(spec['input_shape']))
+
+
+class NumpyModel:
+    """Inference-only replay of an exported Keras model"""
+
+    def __init__(self, layers, input_shape):
+        self.layers = [(spec, weights) for spec, weights in layers if spec['type'] != 'InputLayer']
+        self.input_shape = (None, *input_shape)
+
+    def __call__(self, x, training=False, rng=None):
+        """Forward pass; with ``training`` Dropout layers drop units at random, drawing from ``rng``"""
+        x = np.asarray(x, dtype=np.float32)
+        if training and rng is None:
+            rng = np.random.default_rng()
+        for spec, weights in self.layers:
+            kind = spec['type']
+            if kind == 'LSTM':
+                x = self._lstm(x, spec, *weights)
+            elif kind == 'Dense':
+                kernel, bias = weights
+                x = _ACTIVATIONS[spec['activation']](x @ kernel + bias)
+            elif kind == 'SymbolEmbedding':
+                (embeddings,) = weights
+                ids = np.rint(x[:, -1, -1]).astype(np.int64)
+                embedded = np.broadcast_to(embeddings[ids][:, np.newaxis, :],
+                                           (x.shape[0], x.shape[1], embeddings.shape[1]))
+                x = np.concatenate([x[..., :-1], embedded], axis=-1)
+            elif kind == 'Dropout' and training:
+                # Inverted dropout, as Keras applies it in training mode
+                keep = 1 - spec['rate']
+                x = x * (rng.random(x.shape, dtype=np.float32) < keep) / np.float32(keep)
+        return x
+
+    @staticmethod
+    def _lstm(x, spec, kernel, recurrent_kernel, bias):
+        """Keras LSTM (gate order i, f, c, o) over ``(batch, steps, features)``"""
+        units = spec['units']
+        activation = _ACTIVATIONS[spec['activation']]
+        recurrent_activation = _ACTIVATIONS[spec['recurrent_activation']]
+        batch, steps, _ = x.shape
+
+        # Input projections for every step in one matmul; only the recurrence is sequential
+        projected = x @ kernel + bias
+        h = np.zeros((batch, units), dtype=np.float32)
+        c = np.zeros((batch, units), dtype=np.float32)
+        outputs = np.empty((batch, steps, units), dtype=np.float32) if spec['return_sequences'] else None
+
+        for t in range(steps):
+            z = projected[:, t] + h @ recurrent_kernel
+            i = recurrent_activation(z[:, :units])
+            f = recurrent_activation(z[:, units:2 * units])
+            g = activation(z[:, 2 * units:3 * units])
+            o = recurrent_activation(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * activation(c)
+            if outputs is not None:
+                outputs[:, t] = h
+
+        return outputs if outputs is not None else h
+
+
+class NumpyForecaster:
+    """``Forecaster`` with the same rollout on a NumpyModel"""
+
+    def __init__(self, model, lookback_period, n_features):
+        self.model = model
+        self.lookback_period = lookback_period
+        self.n_features = n_features
+
+    def forecast(self, windows, days=30):
+        sequence = np.asarray(windows, dtype=np.float32)
+        if sequence.ndim == 2:
+            sequence = sequence[np.newaxis]
+        return self._rollout(sequence, days)
+
+    def sample(self, windows, days=30, samples=100, seed=None):
+        """``samples`` rollouts of every window with dropout active, shape ``(batch, samples, days)``"""
+        windows = np.asarray(windows, dtype=np.float32)
+        if windows.ndim == 2:
+            windows = windows[np.newaxis]
+        paths = self._rollout(np.repeat(windows, samples, axis=0), days, np.random.default_rng(seed))
+        return paths.reshape(len(windows), samples, days)
+
+    def _rollout(self, sequence, days, rng=None):
+        predictions = np.empty((sequence.shape[0], days), dtype=np.float32)
+        for step in range(days):
+            pred = self.model(sequence, training=rng is not None, rng=rng)
+            # Predicted close followed by the last known values of the other features
+            new_row = np.concatenate([pred[:, np.newaxis, :], sequence[:, -1:, 1:]], axis=-1)
+            sequence = np.concatenate([sequence[:, 1:], new_row], axis=1)
+            predictions[:, step] = pred[:, 0]
+        return predictions
+
+
+def forecast_intervals(forecaster, windows, days, samples):
+    """Point forecast plus INTERVAL_PERCENTILES over ``samples`` dropout paths
+
+    Returns scaled values of shape ``(batch, days, 1 + len(INTERVAL_PERCENTILES))``.
+    """
+    point = forecaster.forecast(windows, days)
+    bands = np.percentile(forecaster.sample(windows, days, samples), INTERVAL_PERCENTILES, axis=1)
+    return np.concatenate([point[..., np.newaxis], np.moveaxis(bands, 0, -1)], axis=-1)
+
+
+def make_forecaster(model, lookback_period, n_features):
+    """The rollout matching ``model``'s runtime"""
+    if isinstance(model, NumpyModel):
+        return NumpyForecaster(model, lookback_period, n_features)
+    from services.forecasting import Forecaster
+
+    return Forecaster(model, lookback_period, n_features)
@@ -0,0 +1,79 @@
+"""Response serialization for the prediction API.
+
+Price history is built column-wise (vectorized date formatting and bulk
+integer casts) and can be returned either as the usual list of records or
+as a compact ``{dates, prices, volumes}`` object. Responses are encoded
+with orjson when it is installed.
+"""
+import json
+from bisect import bisect_left
+
+import numpy as np
+from flask import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def format_dates(index):
+    """Format a DatetimeIndex as YYYY-MM-DD strings in the index's own timezone"""
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return np.datetime_as_string(index.to_numpy(), unit='D').tolist()
+
+
+def history_columns(hist_data):
+    """Dates, integer close prices and integer volumes of every bar as plain lists"""
+    return {
+        'dates': format_dates(hist_data.index),
+        'prices': hist_data['Close'].to_numpy().astype(np.int64).tolist(),
+        'volumes': hist_data['Volume'].to_numpy().astype(np.int64).tolist(),
+    }
+
+
+def records_to_columns(records):
+    """Turn ``historicalData`` records back into columns"""
+    return {
+        'dates': [record['date'] for record in records],
+        'prices': [record['price'] for record in records],
+        'volumes': [record['volume'] for record in records],
+    }
+
+
+def select_range(columns, since=None, limit=None):
+    """Keep bars dated ``since`` (YYYY-MM-DD) or later, then at most the last ``limit`` of them"""
+    start = bisect_left(columns['dates'], since) if since else 0
+    if limit is not None:
+        start = max(start, len(columns['dates']) - limit)
+    if start == 0:
+        return columns
+    return {key: values[start:] for key, values in columns.items()}
+
+
+def history_payload(columns, compact=False):
+    """Shape history columns as the response's ``historicalData``"""
+    if compact:
+        return columns
+    return [
+        {'date': date, 'price': price, 'volume': volume}
+        for date, price, volume in zip(columns['dates'], columns['prices'], columns['volumes'])
+    ]
+
+
+def dumps(obj):
+    """Encode ``obj`` as JSON bytes (NaN becomes null with orjson)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_response(obj, status=200):
+    return Response(dumps(obj), status=status, mimetype='application/json')
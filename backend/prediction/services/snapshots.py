@@ -0,0 +1,46 @@
+"""Precomputed /stock/<symbol> responses.
+
+``python -m services.build_snapshots`` computes the full response body for
+every symbol after market close and stores it here as a JSON file. The API
+returns those bytes as-is, so a default request costs one file read. A
+snapshot older than ``SNAPSHOT_MAX_AGE`` seconds is ignored, and the route
+falls back to live computation.
+"""
+import os
+import time
+
+from services.datastore import DEFAULT_DATA_DIR, atomic_write
+from services.metrics import metrics
+from services.serialize import dumps
+
+DEFAULT_SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', os.path.join(DEFAULT_DATA_DIR, 'snapshots'))
+# A nightly job plus a couple of hours of slack
+SNAPSHOT_MAX_AGE = int(os.environ.get('SNAPSHOT_MAX_AGE', 26 * 60 * 60))
+
+
+class SnapshotStore:
+    def __init__(self, root=DEFAULT_SNAPSHOT_DIR, max_age=SNAPSHOT_MAX_AGE):
+        self.root = root
+        self.max_age = max_age
+
+    def path(self, symbol):
+        return os.path.join(self.root, f"{symbol.upper()}.json")
+
+    def read(self, symbol):
+        """Return the stored response body for ``symbol`` as bytes, or None if missing or stale"""
+        path = self.path(symbol)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                metrics.inc('cache_requests_total', cache='snapshot', result='stale')
+                return None
+            with open(path, 'rb') as f:
+                payload = f.read()
+        except OSError:
+            metrics.inc('cache_requests_total', cache='snapshot', result='miss')
+            return None
+        metrics.inc('cache_requests_total', cache='snapshot', result='hit')
+        return payload
+
+    def write(self, symbol, payload):
+        os.makedirs(self.root, exist_ok=True)
+        atomic_write(self.path(symbol), lambda f: f.write(dumps(payload)))
@@ -0,0 +1,39 @@
+"""Concurrent request stages with per-stage timeouts.
+
+Independent I/O-bound parts of a request are submitted to a shared thread
+pool and gathered with individual deadlines. A stage that fails or runs out
+of time is reported instead of failing the whole response. A timed-out stage
+keeps running in the pool, so work such as a cache fill still completes for
+the next request.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+
+class StageRunner:
+    def __init__(self, max_workers=8):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stage')
+
+    def submit(self, fn, *args, **kwargs):
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def gather(self, futures, timeouts, started=None):
+        """Wait for named futures, each for at most its own timeout
+
+        Timeouts count from ``started`` (defaults to now), so stages that
+        were submitted together share one clock. Returns ``(results, failed)``
+        where ``failed`` maps stage name to a short reason.
+        """
+        started = time.monotonic() if started is None else started
+        results, failed = {}, {}
+
+        for name, future in futures.items():
+            remaining = max(0.0, started + timeouts[name] - time.monotonic())
+            try:
+                results[name] = future.result(timeout=remaining)
+            except TimeoutError:
+                failed[name] = f"timed out after {timeouts[name]}s"
+            except Exception as e:
+                failed[name] = str(e)
+
+        return results, failed
@@ -0,0 +1,145 @@
+"""Cold start: readiness, post-fork warmup and startup profiling.
+
+Importing the app only loads Flask, NumPy and the app's own modules; pandas,
+scikit-learn, yfinance and TensorFlow are imported on first use. A process
+can therefore answer ``/healthz`` well before it has loaded a model.
+
+``Readiness`` runs the warmup steps (the heavy imports, then the
+PRELOAD_SYMBOLS models and their first forecast) on a background thread, and
+``/readyz`` reports 503 until they are done. Under gunicorn the steps start
+in each worker after the fork (see ``gunicorn.conf.py``), because TensorFlow
+and thread pools do not survive a fork. With WARMUP=0 the process reports
+ready at once and everything loads on first request.
+
+``python app.py --profile-startup`` prints the import cost of every module
+and the time of each warmup step, then exits.
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+from services.metrics import metrics
+
+WARMUP = os.environ.get('WARMUP', '1') == '1'
+# Symbols whose models are loaded and traced before the process reports ready
+PRELOAD_SYMBOLS = [symbol.strip().upper() for symbol in os.environ.get('PRELOAD_SYMBOLS', '').split(',')
+                   if symbol.strip()]
+
+STARTING, WARMING, READY = 'starting', 'warming', 'ready'
+
+
+def warm_entry(entry):
+    """Load an entry's forecaster and run a one-day rollout so the first request skips tracing"""
+    forecaster = entry.forecaster
+    forecaster.forecast(np.zeros((1, forecaster.lookback_period, forecaster.n_features), dtype=np.float32), 1)
+
+
+class Readiness:
+    def __init__(self, enabled=WARMUP):
+        self.enabled = enabled
+        self.state = STARTING
+        self.steps = {}
+        self.errors = {}
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return not self.enabled or self.state == READY
+
+    def start(self, steps):
+        """Run ``[(name, fn)]`` on a background thread, once per process"""
+        if not self.enabled:
+            return
+        with self._lock:
+            # A forked worker inherits the parent's state but not its thread
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.state = WARMING
+        threading.Thread(target=self.run, args=(steps,), name='warmup', daemon=True).start()
+
+    def run(self, steps):
+        started = time.perf_counter()
+        for name, fn in steps:
+            step_started = time.perf_counter()
+            try:
+                with metrics.span('warmup', step=name):
+                    fn()
+            except Exception as e:
+                # Warmup only saves time; whatever failed here loads on first use instead
+                print(f"Error in warmup step {name}: {str(e)}")
+                self.errors[name] = str(e)
+            self.steps[name] = round((time.perf_counter() - step_started) * 1000, 1)
+        self.state = READY
+        print(f"Warmup finished in {time.perf_counter() - started:.2f}s")
+
+    def to_dict(self):
+        return {
+            'state': READY if self.ready else self.state,
+            'steps': dict(self.steps),
+            'errors': dict(self.errors),
+        }
+
+
+def import_costs(module, cwd=None):
+    """``[(name, self_us, cumulative_us, depth)]`` for ``module`` and everything it imports
+
+    Measured with ``python -X importtime`` in a fresh interpreter, so modules
+    already loaded in this process still count. The interpreter's own startup
+    imports are left out.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=cwd, capture_output=True, text=True, check=True,
+    )
+    costs = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # One separator space, then two spaces per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        costs.append((name.strip(), int(self_us), int(cumulative_us), depth))
+
+    # importtime lists children before their parent: the module's imports are
+    # the nested lines right above its own top-level line
+    end = next(i for i, (name, _, _, depth) in enumerate(costs) if name == module and depth == 0)
+    start = end
+    while start > 0 and costs[start - 1][3] > 0:
+        start -= 1
+    return costs[start:end + 1]
+
+
+def profile_startup(module, steps, top=15, cwd=None):
+    """Print the import cost of ``module`` and the duration of each warmup step"""
+    costs = import_costs(module, cwd)
+    total = costs[-1][2]
+    print(f"import {module}: {total / 1000:.0f} ms in a fresh interpreter")
+
+    packages = {}
+    for name, self_us, _, _ in costs:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    print(f"\n{'package':<32} {'ms':>8}")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"{package:<32} {self_us / 1000:>8.1f}")
+
+    # Direct imports of the module, with everything they pulled in
+    print(f"\n{'imported by ' + module:<32} {'ms':>8}")
+    direct = [(name, cumulative) for name, _, cumulative, depth in costs if depth == 1]
+    for name, cumulative in sorted(direct, key=lambda item: -item[1])[:top]:
+        print(f"{name:<32} {cumulative / 1000:>8.1f}")
+
+    readiness = Readiness(enabled=True)
+    started = time.perf_counter()
+    readiness.run(steps)
+    print(f"\n{'warmup step':<32} {'ms':>8}")
+    for name, elapsed in readiness.steps.items():
+        print(f"{name:<32} {elapsed:>8.1f}" + (' (failed)' if name in readiness.errors else ''))
+    print(f"\nready {(total / 1e6) + time.perf_counter() - started:.2f}s after start (import + warmup)")
+    return 1 if readiness.errors else 0
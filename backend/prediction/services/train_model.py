@@ -1,3 +1,7 @@
+# Standalone training script for the legacy services/lstm_model_*.h5 files.
+# Run it from backend/prediction: python -m services.train_model
+import os
+
 import numpy as np
 import pandas as pd
 import yfinance as yf
@@ -5,6 +9,7 @@ from datetime import datetime
 from sklearn.preprocessing import MinMaxScaler
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout
+from services.windowing import make_sequences
 
 # List of blue-chip Indonesian stocks
 blue_chip_stocks = [
@@ -15,11 +20,7 @@ blue_chip_stocks = [
 
 # Function to create sequences
 def create_sequences(data, seq_length):
-    x, y = [], []
-    for i in range(seq_length, len(data)):
-        x.append(data[i-seq_length:i, 0])
-        y.append(data[i, 0])
-    return np.array(x), np.array(y)
+    return make_sequences(data[:, 0], seq_length, materialize=True)
 
 # Training parameters
 seq_length = 60
@@ -64,7 +65,8 @@ for stock in blue_chip_stocks:
     model.fit(x_train, y_train, epochs=epochs, batch_size=batch_size, validation_data=(x_test, y_test))
 
     # Save the model
-    model_filename = f"lstm_model_{symbol}.h5"
+    # Next to this script, where the files were written when it was run from services/
+    model_filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"lstm_model_{symbol}.h5")
     model.save(model_filename)
     print(f"Model for {stock['name']} saved as '{model_filename}'")
 
@@ -0,0 +1,342 @@
+"""Hyperparameter search for the per-symbol LSTM.
+
+Searches the lookback, layer sizes, dropouts, learning rate and batch size
+of ``StockPredictor.create_model`` separately for every symbol. The first
+trial always runs DEFAULT_HYPERPARAMETERS; the rest are random draws from
+SEARCH_SPACE. Up to ``--workers`` trials run at the same time, one process
+each.
+
+A trial is scored by its best validation loss. All trials of a symbol
+validate on the same target rows whatever their lookback, so the scores
+compare. From ``warmup_epochs`` on, a trial is pruned when its best loss so
+far is worse than the median of the finished trials at the same epoch.
+
+The features of a symbol are computed and scaled once per search and saved
+as ``dataset.npy``. Worker processes load that file once and every trial
+builds its windows as views over it. ``--budget`` is wall-clock minutes for
+the search of all symbols, shared out evenly; trials still running at a
+symbol's deadline stop after their current epoch. The best configuration of
+each symbol is then trained on the full history and saved to the registry,
+whose ``meta.json`` keeps it under ``hyperparameters`` so later retrainings
+(``batch_train``, including drift fallbacks) reuse it. Trial logs and a
+``result.json`` per symbol land in ``TUNING_DIR/<version>/<SYMBOL>/``. Run
+from ``backend/prediction``::
+
+    python -m services.tuning --symbols BBCA BBRI --budget 120 --workers 4
+    python -m services.tuning --budget 360 --skip-training
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import statistics
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+from services.backtest import MIN_TRAIN_WINDOWS
+from services.datastore import DEFAULT_DATA_DIR, atomic_write
+from services.registry import DEFAULT_MODEL_DIR, FEATURE_VERSION
+
+TUNING_DIR = os.environ.get('TUNING_DIR', os.path.join(DEFAULT_DATA_DIR, 'tuning'))
+SEARCH_SPACE = {
+    'lookback_period': [20, 30, 45, 60, 90],
+    'units_1': [32, 50, 64, 100, 128],
+    # No 0.0: the p10/p50/p90 bands of ?samples= come from dropout and would collapse without it
+    'dropout_1': [0.1, 0.2, 0.3],
+    'units_2': [32, 50, 70, 100],
+    'dropout_2': [0.1, 0.2, 0.3],
+    'dense_units': [25, 50],
+    'learning_rate': [0.0003, 0.001, 0.003],
+    'batch_size': [16, 32, 64],
+}
+DEFAULT_CONFIG = {
+    'max_epochs': 50,
+    'patience': 10,
+    # No pruning before this epoch, nor against fewer finished trials than min_trials
+    'warmup_epochs': 5,
+    'min_trials': 3,
+    'validation_split': 0.2,
+}
+DATASET_FILE = 'dataset.npy'
+RESULT_FILE = 'result.json'
+TRIALS_DIR = 'trials'
+
+RUNNING, COMPLETE, PRUNED, TIMEOUT, FAILED = 'running', 'complete', 'pruned', 'timeout', 'failed'
+FINISHED = (COMPLETE, PRUNED, TIMEOUT)
+
+
+def read_trials(study_dir):
+    """The records of every trial of a study so far"""
+    directory = os.path.join(study_dir, TRIALS_DIR)
+    trials = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.json'):
+            with open(os.path.join(directory, name)) as f:
+                trials.append(json.load(f))
+    return trials
+
+
+def candidates(defaults, rng):
+    """``defaults`` first, then random configurations from SEARCH_SPACE not tried before"""
+    seen = set()
+    params = dict(defaults)
+    while params is not None:
+        seen.add(json.dumps(params, sort_keys=True))
+        yield params
+        params = None
+        for _ in range(100):
+            sample = {**defaults, **{name: values[rng.integers(len(values))] for name, values in SEARCH_SPACE.items()}}
+            if json.dumps(sample, sort_keys=True) not in seen:
+                params = sample
+                break
+
+
+def should_prune(losses, others, config):
+    """Median rule: is the best of ``losses`` worse than the median of ``others`` at the same epoch?
+
+    ``losses`` are a trial's validation losses per epoch so far and
+    ``others`` the loss curves of finished trials. Trials that stopped
+    before this epoch do not count.
+    """
+    epoch = len(losses)
+    if epoch < config['warmup_epochs']:
+        return False
+    reached = [min(other[:epoch]) for other in others if len(other) >= epoch]
+    if len(reached) < config['min_trials']:
+        return False
+    return min(losses) > statistics.median(reached)
+
+
+@lru_cache(maxsize=None)
+def trial_monitor_class():
+    """The Keras callback class, defined on first use so importing tuning does not import TensorFlow"""
+    from tensorflow.keras.callbacks import Callback
+
+    class TrialMonitor(Callback):
+        """Logs a trial's validation loss after every epoch and stops it when pruned or out of time"""
+
+        def __init__(self, study_dir, record, deadline, config):
+            super().__init__()
+            self.study_dir = study_dir
+            self.record = record
+            self.deadline = deadline
+            self.config = config
+            self.path = os.path.join(study_dir, TRIALS_DIR, f"{record['trial']:04d}.json")
+
+        def on_epoch_end(self, epoch, logs=None):
+            loss = float((logs or {}).get('val_loss', np.nan))
+            if not np.isfinite(loss):
+                self.record['state'] = FAILED
+                self.record['error'] = 'Validation loss is not finite'
+            else:
+                self.record['val_loss'].append(loss)
+                self.record['best'] = min(self.record['val_loss'])
+                others = [trial['val_loss'] for trial in read_trials(self.study_dir)
+                          if trial['state'] in FINISHED and trial['trial'] != self.record['trial']]
+                if should_prune(self.record['val_loss'], others, self.config):
+                    self.record['state'] = PRUNED
+                elif time.time() >= self.deadline:
+                    self.record['state'] = TIMEOUT
+            if self.record['state'] != RUNNING:
+                self.model.stop_training = True
+            atomic_write(self.path, lambda f: json.dump(self.record, f), mode='w')
+
+    return TrialMonitor
+
+
+@lru_cache(maxsize=4)
+def load_dataset(path):
+    """The scaled feature rows of a study, read once per worker process"""
+    return np.load(path)
+
+
+def prepare_dataset(hist_data, study_dir):
+    """Compute and scale the features as ``prepare_data`` does and save them for the trials"""
+    from sklearn.preprocessing import RobustScaler
+    from services.indicators import FEATURE_COLUMNS, compute_features
+
+    features = compute_features(hist_data)[FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+    scaled = RobustScaler().fit_transform(features).astype(np.float32)
+    np.save(os.path.join(study_dir, DATASET_FILE), scaled)
+    return scaled
+
+
+def run_trial(study_dir, trial, params, deadline, config):
+    """Worker entry point: train one configuration and return its trial record"""
+    from tensorflow.keras.callbacks import EarlyStopping
+
+    from app import StockPredictor
+    from services.windowing import make_sequences, window_dataset
+
+    started = time.time()
+    record = {'trial': trial, 'params': params, 'state': RUNNING, 'val_loss': [], 'best': None}
+    monitor = trial_monitor_class()(study_dir, record, deadline, config)
+    try:
+        scaled = load_dataset(os.path.join(study_dir, DATASET_FILE))
+        lookback = params['lookback_period']
+        X, y = make_sequences(scaled, lookback)
+        # Window i predicts row i + lookback, so every trial validates on the same rows
+        split_idx = int(len(scaled) * (1 - config['validation_split'])) - lookback
+
+        model = StockPredictor(hyperparameters=params).create_model((lookback, scaled.shape[1]))
+        model.fit(
+            window_dataset(X[:split_idx], y[:split_idx], batch_size=params['batch_size'], shuffle=True),
+            validation_data=window_dataset(X[split_idx:], y[split_idx:], batch_size=params['batch_size'], cache=True),
+            epochs=config['max_epochs'],
+            verbose=0,
+            callbacks=[EarlyStopping(monitor='val_loss', patience=config['patience']), monitor],
+        )
+        if record['state'] == RUNNING:
+            record['state'] = COMPLETE
+    except Exception as e:
+        print(f"Error in trial {trial}: {str(e)}")
+        record['state'] = FAILED
+        record['error'] = str(e)
+
+    record['seconds'] = round(time.time() - started, 1)
+    atomic_write(monitor.path, lambda f: json.dump(record, f), mode='w')
+    return record
+
+
+def search_symbol(pool, workers, symbol, hist_data, deadline, config, directory, seed=None):
+    """Run trials for one symbol on ``pool`` until ``deadline``; return the result, also saved as result.json"""
+    from app import DEFAULT_HYPERPARAMETERS
+
+    started = time.time()
+    study_dir = os.path.join(directory, FEATURE_VERSION, symbol)
+    shutil.rmtree(os.path.join(study_dir, TRIALS_DIR), ignore_errors=True)
+    os.makedirs(os.path.join(study_dir, TRIALS_DIR))
+
+    scaled = prepare_dataset(hist_data, study_dir)
+    train_rows = int(len(scaled) * (1 - config['validation_split']))
+    if train_rows - max(SEARCH_SPACE['lookback_period']) < MIN_TRAIN_WINDOWS:
+        raise ValueError(f"Insufficient data: {len(scaled)} rows")
+
+    params_iter = candidates(DEFAULT_HYPERPARAMETERS, np.random.default_rng(seed))
+    running, trials, submitted = {}, [], 0
+    while True:
+        while len(running) < workers and time.time() < deadline:
+            params = next(params_iter, None)
+            if params is None:
+                break
+            running[pool.submit(run_trial, study_dir, submitted, params, deadline, config)] = submitted
+            submitted += 1
+        if not running:
+            break
+
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            trial = running.pop(future)
+            try:
+                record = future.result()
+            except Exception as e:
+                record = {'trial': trial, 'state': FAILED, 'val_loss': [], 'best': None, 'error': str(e)}
+            trials.append(record)
+            print(f"  {symbol} trial {trial}: {record['state']} after {len(record['val_loss'])} epochs, "
+                  f"best val_loss {record['best']}")
+
+    # Pruned trials were worse than the median when they stopped, so they never win
+    scored = [trial for trial in trials if trial['state'] in (COMPLETE, TIMEOUT) and trial['best'] is not None]
+    best = min(scored, key=lambda trial: trial['best'], default=None)
+    baseline = next((trial for trial in trials if trial['trial'] == 0), None)
+    result = {
+        'symbol': symbol,
+        'version': FEATURE_VERSION,
+        'config': config,
+        'params': best['params'] if best else None,
+        'val_loss': best['best'] if best else None,
+        'default_val_loss': baseline['best'] if baseline else None,
+        'trials': {state: sum(trial['state'] == state for trial in trials) for state in FINISHED + (FAILED,)},
+        'seconds': round(time.time() - started, 1),
+        'finished_at': datetime.utcnow().isoformat(timespec='seconds'),
+    }
+    atomic_write(os.path.join(study_dir, RESULT_FILE), lambda f: json.dump(result, f), mode='w')
+    return result
+
+
+def main(argv=None):
+    from app import DX_STOCKS
+    from services.batch_train import _init_worker, train_symbol
+    from services.datastore import BarStore
+
+    parser = argparse.ArgumentParser(description='Hyperparameter search for the DX_STOCKS LSTMs')
+    parser.add_argument('--symbols', nargs='+', default=list(DX_STOCKS),
+                        help='Symbols to tune (default: every DX_STOCKS symbol)')
+    parser.add_argument('--budget', type=float, default=60,
+                        help='Wall-clock minutes for the search over all symbols')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Trials run in parallel, one process each')
+    parser.add_argument('--intra-op-threads', type=int, default=1,
+                        help='TensorFlow intra-op threads per worker')
+    parser.add_argument('--period', default='5y', help='History period to tune and train on')
+    parser.add_argument('--max-epochs', type=int, default=DEFAULT_CONFIG['max_epochs'])
+    parser.add_argument('--patience', type=int, default=DEFAULT_CONFIG['patience'])
+    parser.add_argument('--seed', type=int, help='Seed for the sampled configurations')
+    parser.add_argument('--output-dir', default=TUNING_DIR)
+    parser.add_argument('--model-dir', default=DEFAULT_MODEL_DIR)
+    parser.add_argument('--skip-training', action='store_true',
+                        help='Only record the best configurations, do not train and save the models')
+    args = parser.parse_args(argv)
+
+    config = {**DEFAULT_CONFIG, 'max_epochs': args.max_epochs, 'patience': args.patience}
+    symbols = [symbol.upper() for symbol in args.symbols]
+    workers = max(1, args.workers)
+    started = time.time()
+    end = started + args.budget * 60
+    results, failed = {}, []
+    store = BarStore()
+
+    # Spawn rather than fork so every worker starts with a clean TensorFlow runtime
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(args.intra_op_threads, 1),
+    ) as pool:
+        for i, symbol in enumerate(symbols):
+            # Time a symbol leaves unused goes to the ones after it
+            deadline = time.time() + (end - time.time()) / (len(symbols) - i)
+            try:
+                hist_data = store.history(symbol, period=args.period)
+                if hist_data.empty:
+                    raise ValueError('No data found for this symbol')
+                result = search_symbol(pool, workers, symbol, hist_data, deadline, config, args.output_dir,
+                                       args.seed)
+            except Exception as e:
+                print(f"Error tuning {symbol}: {str(e)}")
+                failed.append(symbol)
+                continue
+            results[symbol] = result
+            print(f"[ok] {symbol} in {result['seconds']:.1f}s: {result['trials']}, best val_loss "
+                  f"{result['val_loss']} (defaults {result['default_val_loss']}), {result['params']}")
+
+        if not args.skip_training:
+            futures = {
+                pool.submit(train_symbol, symbol, args.period, args.model_dir, FEATURE_VERSION, False,
+                            result['params']): symbol
+                for symbol, result in results.items() if result['params'] is not None
+            }
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    _, ok, detail, elapsed = future.result()
+                except Exception as e:
+                    ok, detail, elapsed = False, str(e), 0.0
+                if not ok:
+                    failed.append(symbol)
+                print(f"[{'ok' if ok else 'failed'}] trained {symbol} in {elapsed:.1f}s: {detail}")
+
+    print(f"Tuned {len(results)}/{len(symbols)} symbols in {time.time() - started:.1f}s")
+    if failed:
+        print(f"Failed: {', '.join(sorted(set(failed)))}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,76 @@
+"""Sliding-window helpers for the LSTM sequence models.
+
+Windows are returned as strided views over the input array, so building the
+training set costs no copy; call ``materialize_windows`` only when a model actually
+needs a contiguous tensor.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def sliding_windows(data, window):
+    """Return every ``window``-long run of rows of ``data`` as a zero-copy view
+
+    A ``(n, features)`` input gives ``(n - window + 1, window, features)`` and a
+    1-D input gives ``(n - window + 1, window)``.
+    """
+    data = np.asarray(data)
+    if len(data) < window:
+        return np.empty((0, window) + data.shape[1:], dtype=data.dtype)
+
+    windows = sliding_window_view(data, window, axis=0)
+    if data.ndim > 1:
+        # sliding_window_view puts the window axis last; move it next to the sample axis
+        windows = np.moveaxis(windows, -1, 1)
+    return windows
+
+
+def make_sequences(data, lookback, target_column=0, materialize=False, dtype=np.float32):
+    """Build ``(X, y)`` where ``X[i]`` holds the ``lookback`` rows preceding ``y[i]``
+
+    Equivalent to appending ``data[i - lookback:i]`` for every ``i`` in
+    ``range(lookback, len(data))``, without copying each window. ``y`` is the
+    ``target_column`` of the row following each window (or the value itself for
+    1-D input).
+    """
+    data = np.asarray(data)
+    X = sliding_windows(data[:-1], lookback)
+    y = data[lookback:, target_column] if data.ndim > 1 else data[lookback:]
+
+    if materialize:
+        return materialize_windows(X, dtype), np.asarray(y, dtype=dtype)
+    return X, y
+
+
+def materialize_windows(windows, dtype=np.float32):
+    """Copy a window view into a contiguous array of ``dtype``"""
+    return np.ascontiguousarray(windows, dtype=dtype)
+
+
+def window_dataset(windows, targets, batch_size=32, shuffle=False, cache=False):
+    """``tf.data`` batches of ``(window, target)`` for consecutive sliding ``windows``
+
+    Only the underlying ``(n + lookback - 1, features)`` series is copied into
+    TensorFlow; each batch of windows is gathered from it on the fly, so the
+    full ``(n, lookback, features)`` tensor is never built. With ``cache`` the
+    gathered batches are kept after the first epoch (use it for fixed
+    validation data, not with ``shuffle``).
+    """
+    import tensorflow as tf
+
+    n, lookback = windows.shape[:2]
+    # Consecutive windows overlap in all but their last row
+    series = tf.constant(np.concatenate([windows[0], windows[1:, -1]]).astype(np.float32))
+    targets = tf.constant(np.asarray(targets, dtype=np.float32))
+    offsets = tf.range(lookback, dtype=tf.int64)
+
+    dataset = tf.data.Dataset.range(n)
+    if shuffle:
+        dataset = dataset.shuffle(n, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size).map(
+        lambda index: (tf.gather(series, index[:, tf.newaxis] + offsets), tf.gather(targets, index)),
+        num_parallel_calls=tf.data.AUTOTUNE,
+    )
+    if cache:
+        dataset = dataset.cache()
+    return dataset.prefetch(tf.data.AUTOTUNE)
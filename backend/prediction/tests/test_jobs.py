@@ -0,0 +1,68 @@
+"""Jobs are shared by every worker using the same job directory."""
+import threading
+import time
+
+from services.jobs import DONE, FAILED, Job, JobManager
+
+
+def wait_finished(manager, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    job = manager.get(job_id)
+    while not job.finished and time.monotonic() < deadline:
+        job = manager.wait(job_id, job.version, timeout=1)
+    return job
+
+
+def test_another_worker_sees_progress_and_result(tmp_path):
+    first, second = JobManager(str(tmp_path)), JobManager(str(tmp_path))
+
+    def fn(job):
+        first.update(job, progress={'epoch': 1})
+        return {'symbol': 'BBCA'}
+
+    job = first.submit('train', fn, symbol='BBCA', key=('train', 'BBCA'))
+    seen = wait_finished(second, job.id)
+    assert seen.status == DONE
+    assert seen.progress == {'epoch': 1}
+    assert seen.result == {'symbol': 'BBCA'}
+    assert second.get('missing') is None
+
+
+def test_duplicate_keys_share_one_job_across_workers(tmp_path):
+    first, second = JobManager(str(tmp_path)), JobManager(str(tmp_path))
+    release = threading.Event()
+
+    job = first.submit('train', lambda job: release.wait(5), key=('train', 'BBCA'))
+    assert second.submit('train', lambda job: None, key=('train', 'BBCA')).id == job.id
+    release.set()
+    assert wait_finished(second, job.id).status == DONE
+
+
+def test_training_cap_holds_across_workers(tmp_path):
+    managers = [JobManager(str(tmp_path), max_workers=1) for _ in range(3)]
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def fn(job):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.2)
+        with lock:
+            running[0] -= 1
+
+    submitted = [manager.submit('train', fn) for manager in managers]
+    assert all(wait_finished(managers[0], job.id).status == DONE for job in submitted)
+    assert peak[0] == 1
+
+
+def test_job_of_an_exited_worker_is_failed(tmp_path):
+    manager = JobManager(str(tmp_path))
+    job = Job('train', 'BBCA')
+    # A pid that cannot be running
+    job.owner = job.owner.rsplit(':', 1)[0] + ':999999999'
+    manager._save(job)
+
+    seen = manager.get(job.id)
+    assert seen.status == FAILED
+    assert seen.finished
@@ -0,0 +1,83 @@
+"""The NumPy runtime must reproduce the Keras models it was exported from."""
+import numpy as np
+import pytest
+
+from services.export_runtime import random_windows
+from services.forecasting import Forecaster
+from services.global_model import create_global_model
+from services.runtime import INTERVAL_PERCENTILES, NumpyForecaster, export_model, forecast_intervals, load_exported
+
+LOOKBACK = 12
+N_FEATURES = 5
+DAYS = 10
+# Largest allowed absolute difference in scaled units, as for `export_runtime --verify`
+TOLERANCE = 1e-4
+
+
+def lstm_model():
+    """The per-symbol architecture at a size that builds in a second"""
+    from tensorflow.keras import Input
+    from tensorflow.keras.layers import LSTM, Dense, Dropout
+    from tensorflow.keras.models import Sequential
+
+    return Sequential([
+        Input(shape=(LOOKBACK, N_FEATURES)),
+        LSTM(units=16, return_sequences=True),
+        Dropout(0.2),
+        LSTM(units=8, return_sequences=False),
+        Dropout(0.1),
+        Dense(units=4),
+        Dense(units=1)
+    ])
+
+
+@pytest.fixture(params=['lstm', 'global'])
+def exported(request, tmp_path):
+    """(Keras model, its NumPy export, features per window step)"""
+    if request.param == 'global':
+        model = create_global_model(LOOKBACK, N_FEATURES, n_symbols=3)
+    else:
+        model = lstm_model()
+    path = tmp_path / 'model.npz'
+    export_model(model, str(path))
+    return model, load_exported(str(path)), model.input_shape[-1]
+
+
+def test_single_prediction_matches_keras(exported):
+    model, runtime_model, _ = exported
+    windows = random_windows(model, 8)
+    np.testing.assert_allclose(runtime_model(windows), model.predict(windows, verbose=0), atol=TOLERANCE)
+
+
+def test_rollout_matches_forecaster(exported):
+    model, runtime_model, n_features = exported
+    windows = random_windows(model, 8)
+    expected = Forecaster(model, LOOKBACK, n_features).forecast(windows, DAYS)
+    actual = NumpyForecaster(runtime_model, LOOKBACK, n_features).forecast(windows, DAYS)
+    assert actual.shape == (8, DAYS)
+    np.testing.assert_allclose(actual, expected, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize('runtime', ['keras', 'numpy'])
+def test_sample_shapes(exported, runtime):
+    model, runtime_model, n_features = exported
+    if runtime == 'numpy':
+        forecaster = NumpyForecaster(runtime_model, LOOKBACK, n_features)
+    else:
+        forecaster = Forecaster(model, LOOKBACK, n_features)
+    windows = random_windows(model, 3)
+    paths = forecaster.sample(windows, DAYS, samples=20)
+    assert paths.shape == (3, 20, DAYS)
+    # Dropout is active, so the paths of one window differ
+    assert np.ptp(paths[:, :, 0], axis=1).min() > 0
+    assert forecaster.sample(windows[0], DAYS, samples=20).shape == (1, 20, DAYS)
+
+
+def test_forecast_intervals_orders_bands(exported):
+    model, runtime_model, n_features = exported
+    forecaster = NumpyForecaster(runtime_model, LOOKBACK, n_features)
+    intervals = forecast_intervals(forecaster, random_windows(model, 3), DAYS, samples=50)
+    assert intervals.shape == (3, DAYS, 1 + len(INTERVAL_PERCENTILES))
+    np.testing.assert_allclose(intervals[..., 0], forecaster.forecast(random_windows(model, 3), DAYS))
+    p10, p50, p90 = np.moveaxis(intervals[..., 1:], -1, 0)
+    assert (p10 <= p50).all() and (p50 <= p90).all()